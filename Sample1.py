@@ -1,13 +1,12 @@
 from datetime import datetime
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json, sqlite3, hashlib, random
+from tkinter import ttk, messagebox, filedialog
+from collections import deque
+import os, random, sqlite3, time
+from task_service import PasswordHasher, DatabaseManager, FacetIndex, TaskFiles, TaskService, Metrics
 
 class Utils:
-    @staticmethod
-    def hash_password(password): return hashlib.sha256(password.encode()).hexdigest()
-    
     @staticmethod
     def create_entry(parent, placeholder, show=None, **kwargs):
         return ctk.CTkEntry(parent, placeholder_text=placeholder, show=show, **kwargs)
@@ -16,50 +15,6 @@ class Utils:
     def create_button(parent, text, command, **kwargs):
         return ctk.CTkButton(parent, text=text, command=command, **kwargs)
 
-class DataStructure:
-    def __init__(self): self.items = []
-    def is_empty(self): return len(self.items) == 0
-    def size(self): return len(self.items)
-
-class Queue(DataStructure):
-    def enqueue(self, item): self.items.append(item)
-    def dequeue(self): return self.items.pop(0) if not self.is_empty() else None
-
-class Stack(DataStructure):
-    def push(self, item): self.items.append(item)
-    def pop(self): return self.items.pop() if not self.is_empty() else None
-
-class DatabaseManager:
-    def __init__(self, db_name='users.db'):
-        self.db_name = db_name
-        self.conn = None
-        self.cursor = None
-
-    def __enter__(self):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL)''')
-        self.conn.commit()
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.conn: self.conn.close()
-
-    def add_user(self, username, password):
-        try:
-            self.cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", 
-                              (username, Utils.hash_password(password)))
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-
-    def validate_user(self, username, password):
-        self.cursor.execute("SELECT * FROM users WHERE username=? AND password=?", 
-                          (username, Utils.hash_password(password)))
-        return self.cursor.fetchone() is not None
-
 class BaseWindow(ctk.CTk):
     def __init__(self, title, size, mode="dark"):
         super().__init__()
@@ -68,42 +23,214 @@ class BaseWindow(ctk.CTk):
         ctk.set_appearance_mode(mode)
         ctk.set_default_color_theme("blue")
 
-    def create_frame(self, **kwargs):
-        return ctk.CTkFrame(self, **kwargs)
-
-    def create_label(self, text, **kwargs):
-        return ctk.CTkLabel(self, text=text, **kwargs)
-
-class Task:
-    def __init__(self, title, description, due_date, priority, category):
-        self.title = title
-        self.description = description
-        self.due_date = due_date
-        self.priority = priority
-        self.category = category
-        self.completed = False
-
-    def to_dict(self):
-        return {
-            "title": self.title,
-            "description": self.description,
-            "due_date": self.due_date,
-            "priority": self.priority,
-            "category": self.category,
-            "completed": self.completed
-        }
-
-    @classmethod
-    def from_dict(cls, task_dict):
-        task = cls(
-            task_dict.get("title", ""),
-            task_dict.get("description", ""),
-            task_dict.get("due_date", ""),
-            task_dict.get("priority", "Low"),
-            task_dict.get("category", "Other")
-        )
-        task.completed = task_dict["completed"]
-        return task
+    def create_frame(self, parent=None, **kwargs):
+        return ctk.CTkFrame(parent or self, **kwargs)
+
+    def create_label(self, parent=None, text="", **kwargs):
+        return ctk.CTkLabel(parent or self, text=text, **kwargs)
+
+    def run_in_background(self, work, on_done, *args):
+        # on_done receives the finished future on the Tk thread.
+        future = PasswordHasher.submit(work, *args)
+        def poll():
+            if future.done(): on_done(future)
+            else: self.after(20, poll)
+        poll()
+
+class TaskListView:
+    # Keeps only the scrolled-to window of rows (plus BUFFER on each side) materialized in the
+    # Treeview and patches it row by row, instead of rebuilding the whole tree on every change.
+    BUFFER = 50
+    HEADING_HEIGHT = 25
+
+    def __init__(self, tree, scrollbar, row_height=None, overdue=None):
+        # tree and scrollbar only need the ttk calls used here, so a headless stand-in can replace them.
+        # overdue is a live set of task ids whose rows get the "overdue" tag.
+        self.tree = tree
+        self.overdue = overdue if overdue is not None else set()
+        self.scrollbar = scrollbar
+        self.rows = []
+        self.first = self.start = self.end = 0
+        self.visible = int(tree.cget("height"))
+        self.row_height = row_height or int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        tree.configure(yscrollcommand=self.on_tree_scroll)
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", self.on_resize, add="+")
+        tree.tag_configure("green", foreground="green")
+        tree.tag_configure("red", foreground="red")
+        tree.tag_configure("overdue", background="#5a1e1e")
+
+    def row(self, task):
+        status_symbol = "✅" if task.completed else "❌"
+        tags = ("green",) if task.completed else ("red", "overdue") if task.id in self.overdue else ("red",)
+        return {"values": (task.title, task.priority, task.due_date, task.category, status_symbol), "tags": tags}
+
+    @Metrics.timed("view.load_task_list")
+    def reset(self, tasks):
+        self.rows = list(tasks)
+        materialized = self.tree.get_children()
+        if materialized: self.tree.delete(*materialized)
+        self.render()
+
+    def insert(self, task, before=None):
+        if before is not None and before in self.rows: self.rows.insert(self.rows.index(before), task)
+        else: self.rows.append(task)
+        self.render()
+
+    def extend(self, tasks):
+        self.rows.extend(tasks)
+        self.render()
+
+    def replace(self, tasks):
+        # Same rows in the same relative order plus or minus some: render() patches just the difference.
+        self.rows = list(tasks)
+        self.render()
+
+    def update(self, tasks):
+        materialized = set(self.tree.get_children())
+        for task in tasks:
+            if task.id in materialized: self.tree.item(task.id, **self.row(task))
+
+    def delete(self, tasks):
+        if len(tasks) == 1 and tasks[0] in self.rows:
+            self.rows.remove(tasks[0])
+        else:
+            ids = {task.id for task in tasks}
+            self.rows = [task for task in self.rows if task.id not in ids]
+        self.render()
+
+    def show(self, task):
+        self.scroll_to(self.rows.index(task) - self.visible // 2)
+
+    def scroll_to(self, first):
+        self.first = first
+        self.render()
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        else:
+            step = self.visible if args[2] == "pages" else 1
+            self.scroll_to(self.first + int(args[1]) * step)
+
+    def on_tree_scroll(self, low, high):
+        # Wheel and keyboard scrolling move the Treeview inside the materialized block; page in
+        # more rows once the view gets within half a buffer of either edge.
+        self.first = self.start + round(float(low) * (self.end - self.start))
+        near_top = self.start > 0 and self.first - self.start < self.BUFFER // 2
+        near_bottom = self.end < len(self.rows) and self.end - self.first - self.visible < self.BUFFER // 2
+        if near_top or near_bottom:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.HEADING_HEIGHT) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    @Metrics.timed("view.render")
+    def render(self):
+        total = len(self.rows)
+        self.first = max(0, min(self.first, total - self.visible))
+        start = max(0, self.first - self.BUFFER)
+        end = min(total, self.first + self.visible + self.BUFFER)
+        wanted = self.rows[start:end]
+        wanted_ids = {task.id for task in wanted}
+
+        materialized = self.tree.get_children()
+        stale = [iid for iid in materialized if iid not in wanted_ids]
+        if stale: self.tree.delete(*stale)
+        existing = set(materialized).difference(stale)
+        for position, task in enumerate(wanted):
+            if task.id not in existing:
+                self.tree.insert("", position, iid=task.id, **self.row(task))
+
+        self.start, self.end = start, end
+        if end > start: self.tree.yview_moveto((self.first - start) / (end - start))
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.rows)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, min(1, (self.first + self.visible) / total))
+
+class ParticleField:
+    # The dots drifting behind the login form. Each speed lane shares a canvas tag, so a frame is one
+    # move per lane rather than a move and a coords read per particle. Lane positions are mirrored
+    # here, bottom-most first, so the particles that crossed the edge are found without asking Tk.
+    # TASKMASTER_PARTICLES sets the count (COUNT when it isn't a number); 0 turns the animation off.
+    COUNT = 50
+    SPEEDS = (0.5, 1.0, 2.0)  # pixels per FRAME_MS
+    COLORS = ("#8d8d8d", "#617980", "#696969")  # white, light blue and gray at half opacity on #1a1a1a
+    FRAME_MS = 50
+    MAX_FRAME_MS = 200
+
+    def __init__(self, canvas, width, height, count=None, rng=random):
+        self.canvas = canvas
+        self.height = height
+        self.interval = self.FRAME_MS
+        self.job = None
+        self.last = self.lag = 0.0
+        self.lanes = [{"tag": f"particles{i}", "speed": speed, "offset": 0.0, "particles": []}
+                      for i, speed in enumerate(self.SPEEDS)]
+        if count is None:
+            try:
+                count = int(os.environ.get("TASKMASTER_PARTICLES", self.COUNT))
+            except ValueError:
+                count = self.COUNT
+        for _ in range(count):
+            lane = rng.choice(self.lanes)
+            x, y, size = rng.randint(0, width), rng.randint(0, height), rng.randint(1, 3)
+            item = canvas.create_oval(x, y, x + size, y + size, fill=rng.choice(self.COLORS), outline="", tags=(lane["tag"],))
+            lane["particles"].append([y, item])
+        for lane in self.lanes:
+            lane["particles"] = deque(sorted(lane["particles"], reverse=True))
+
+    @Metrics.timed("login.particles")
+    def step(self, frames=1.0):
+        wrapped = []
+        for lane in self.lanes:
+            dy = lane["speed"] * frames
+            self.canvas.move(lane["tag"], 0, dy)
+            lane["offset"] += dy
+            particles = lane["particles"]
+            for _ in range(len(particles)):
+                if particles[0][0] + lane["offset"] <= self.height: break
+                particle = particles.popleft()
+                particle[0] -= self.height
+                particles.append(particle)
+                wrapped.append(particle[1])
+        for item in wrapped:
+            self.canvas.move(item, 0, -self.height)
+        return wrapped
+
+    def start(self):
+        if self.job is not None or not any(lane["particles"] for lane in self.lanes): return
+        self.last = time.perf_counter()
+        self.job = self.canvas.after(self.interval, self.tick)
+
+    def stop(self):
+        if self.job is not None: self.canvas.after_cancel(self.job)
+        self.job = None
+
+    def tick(self):
+        # Motion follows the clock, so a late timer moves further rather than slowing the drift. When
+        # timers keep running late (a busy or remote display) the frame rate halves, down to
+        # 1000 / MAX_FRAME_MS, and climbs back once they are on time again.
+        now = time.perf_counter()
+        elapsed = (now - self.last) * 1000
+        self.last = now
+        self.step(min(elapsed, self.MAX_FRAME_MS) / self.FRAME_MS)
+        self.lag = 0.8 * self.lag + 0.2 * max(0.0, elapsed - self.interval)
+        if self.lag > self.interval / 2 and self.interval < self.MAX_FRAME_MS:
+            self.interval, self.lag = self.interval * 2, 0.0
+        elif self.lag < self.interval / 10 and self.interval > self.FRAME_MS:
+            self.interval, self.lag = self.interval // 2, 0.0
+        self.job = self.canvas.after(self.interval, self.tick)
 
 class LoginWindow(BaseWindow):
     def __init__(self):
@@ -119,6 +246,7 @@ class LoginWindow(BaseWindow):
         self.main_frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
         
         self.logo_label = self.create_label(
+            self.main_frame,
             text="TaskMaster",
             font=("Helvetica", 36, "bold"),
             text_color="white"
@@ -128,24 +256,18 @@ class LoginWindow(BaseWindow):
         self.create_login_widgets()
 
     def setup_particles(self):
-        self.particles = []
-        for _ in range(50):
-            x = random.randint(0, 600)
-            y = random.randint(0, 500)
-            size = random.randint(1, 3)
-            speed = random.uniform(0.5, 2)
-            color = random.choice(['white', 'light blue', 'gray'])
-            particle = self.canvas.create_oval(x, y, x + size, y + size, fill=color, stipple='gray50')
-            self.particles.append((particle, speed))
-        self.animate_background()
-
-    def animate_background(self):
-        for particle, speed in self.particles:
-            self.canvas.move(particle, 0, speed)
-            coords = self.canvas.coords(particle)
-            if coords[1] > 500:
-                self.canvas.coords(particle, coords[0], 0, coords[2], coords[3] - coords[1])
-        self.after(50, self.animate_background)
+        # Paused while the window is minimized or another application has the focus.
+        self.particles = ParticleField(self.canvas, 600, 500)
+        self.canvas.bind("<Destroy>", lambda event: self.particles.stop())
+        self.bind("<Map>", lambda event: event.widget is self and self.particles.start(), add="+")
+        self.bind("<Unmap>", lambda event: event.widget is self and self.particles.stop(), add="+")
+        self.bind("<FocusIn>", lambda event: self.particles.start(), add="+")
+        self.bind("<FocusOut>", lambda event: self.after_idle(self.pause_unfocused), add="+")
+        self.particles.start()
+
+    def pause_unfocused(self):
+        # Focus moving between the form's own widgets also fires FocusOut; only pause once none has it.
+        if not self.tk.call("focus"): self.particles.stop()
 
     def login(self):
         username = self.username_entry.get()
@@ -155,13 +277,28 @@ class LoginWindow(BaseWindow):
             messagebox.showerror("Login Failed", "Please enter both username and password")
             return
 
+        self.login_button.configure(state="disabled")
+        self.run_in_background(self.authenticate, self.finish_login, username, password)
+
+    @staticmethod
+    def authenticate(username, password):
         with DatabaseManager() as db:
-            if db.validate_user(username, password):
-                self.destroy()
-                app = TaskManagerApp()
-                app.mainloop()
-            else:
-                messagebox.showerror("Login Failed", "Invalid username or password")
+            return db.validate_user(username, password)
+
+    def finish_login(self, future):
+        self.login_button.configure(state="normal")
+        try:
+            user_id = future.result()
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", str(e))
+            return
+
+        if user_id is not None:
+            self.destroy()
+            app = TaskManagerApp(user_id)
+            app.mainloop()
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password")
 
     def signup(self):
         username = self.username_entry.get()
@@ -176,12 +313,27 @@ class LoginWindow(BaseWindow):
             messagebox.showerror("Error", "Passwords do not match")
             return
 
+        self.create_account_button.configure(state="disabled")
+        self.run_in_background(self.register, self.finish_signup, username, password)
+
+    @staticmethod
+    def register(username, password):
         with DatabaseManager() as db:
-            if db.add_user(username, password):
-                messagebox.showinfo("Success", "Account created successfully")
-                self.create_login_widgets()
-            else:
-                messagebox.showerror("Error", "Username already exists")
+            return db.add_user(username, password)
+
+    def finish_signup(self, future):
+        self.create_account_button.configure(state="normal")
+        try:
+            created = future.result()
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", str(e))
+            return
+
+        if created:
+            messagebox.showinfo("Success", "Account created successfully")
+            self.create_login_widgets()
+        else:
+            messagebox.showerror("Error", "Username already exists")
 
     def create_login_widgets(self):
         for widget in self.main_frame.winfo_children():
@@ -221,14 +373,61 @@ class LoginWindow(BaseWindow):
         self.back_to_login_button.pack(pady=10)
 
 class TaskManagerApp(BaseWindow):
-    def __init__(self):
+    POLL_INTERVAL = 100
+    SEARCH_DELAY = 150
+    METRICS_INTERVAL = 1000
+    # The reminder timer is re-checked at least this often, so a suspend or clock change can't strand it.
+    REMINDER_MAX_DELAY = 60 * 60 * 1000
+
+    def __init__(self, user_id):
         super().__init__("TaskMaster - Dashboard", "1000x700", "dark")
-        self.tasks = Queue()
-        self.undo_stack = Stack()
-        self.redo_stack = Stack()
-        self.file_path = "tasks.json"
-        self.load_tasks()
+        self.user_id = user_id
+        self.service = TaskService(user_id)
+        self.service.import_legacy()
+        self.service.listeners.append(self.on_tasks_changed)
+        self.tasks = self.service.tasks
+        self.writer = self.service.writer
+        self.search_query = ""
+        self.sort_column = None
+        self.sort_descending = False
+        self.view_derived = False
+        self.refresh_job = None
+        self.metrics_job = None
+        self.reminder_job = None
+        self.reminder_deadline = None
+        # Only the first page is read before the window opens; load_next_page streams in the rest.
+        self.service.load_page()
         self.setup_ui()
+        self.arm_reminder()
+        self.after(1, self.load_next_page)
+        self.after(self.POLL_INTERVAL, self.poll_writer)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        if self.reminder_job is not None: self.after_cancel(self.reminder_job)
+        self.service.close()
+        self.report_writes()
+        self.destroy()
+
+    def poll_writer(self):
+        # Also picks up changes made by other TaskMaster windows or command-line runs on the same database.
+        self.report_writes()
+        self.service.sync()
+        self.after(self.POLL_INTERVAL, self.poll_writer)
+
+    def report_writes(self):
+        while not self.writer.results.empty():
+            result = self.writer.results.get()
+            if result[0] == "error":
+                messagebox.showerror("Save Failed", str(result[1]))
+            elif result[0] == "conflict":
+                self.status_label.configure(text=f"{len(result[1])} change(s) not saved: the task was changed "
+                                                 f"in another window, and that version is shown")
+            else:
+                stats = self.writer.stats
+                self.status_label.configure(text=f"Saved {result[1]} change(s) in {result[2] * 1000:.1f} ms · "
+                                                 f"queue {self.writer.depth()} (max {stats['max_depth']}) · "
+                                                 f"avg write {stats['total_latency'] / stats['writes'] * 1000:.1f} ms")
 
     def setup_ui(self):
         self.main_frame = self.create_frame(corner_radius=10)
@@ -264,19 +463,45 @@ class TaskManagerApp(BaseWindow):
         self.category_combobox.pack(pady=5)
 
         Utils.create_button(sidebar, "Add Task", self.add_task, width=250).pack(pady=20)
+        Utils.create_button(sidebar, "Import Tasks", self.import_tasks, width=250).pack(pady=5)
+        Utils.create_button(sidebar, "Export Tasks", self.export_tasks, width=250).pack(pady=5)
 
         self.create_label(sidebar, "Appearance Mode").pack(pady=(20, 5))
         self.appearance_mode_toggle = ctk.CTkComboBox(sidebar, values=["Dark", "Light"], command=self.toggle_appearance_mode, width=250)
         self.appearance_mode_toggle.set("Dark")
         self.appearance_mode_toggle.pack(pady=5)
 
+        self.metrics_switch = ctk.CTkSwitch(sidebar, text="Performance Metrics", command=self.toggle_metrics)
+        self.metrics_switch.pack(pady=(20, 5))
+        self.metrics_panel = self.create_frame(sidebar)
+        self.metrics_text = ctk.CTkTextbox(self.metrics_panel, width=250, height=180, font=("Courier", 11))
+        self.metrics_text.pack()
+        Utils.create_button(self.metrics_panel, "Export Metrics", self.export_metrics, width=250).pack(pady=5)
+        if Metrics.enabled:
+            self.metrics_switch.select()
+            self.toggle_metrics()
+
     def create_task_list(self):
         task_list_frame = self.create_frame(self.main_frame)
         task_list_frame.pack(side="right", expand=True, fill="both", padx=10, pady=10)
 
         self.create_label(task_list_frame, "Task List", font=("Helvetica", 18, "bold")).pack(pady=(20, 10))
 
-        self.task_tree = ttk.Treeview(task_list_frame, columns=("Title", "Priority", "Due Date", "Category", "Status"), show="headings", style="Treeview")
+        self.search_entry = Utils.create_entry(task_list_frame, "Search tasks...", width=400)
+        self.search_entry.pack(pady=(0, 5))
+        self.search_entry.bind("<KeyRelease>", lambda event: self.schedule_refresh())
+
+        filter_frame = self.create_frame(task_list_frame)
+        filter_frame.pack(pady=(0, 5))
+        self.filter_boxes = {}
+        for facet, values in (("category", ["Work", "Personal", "Study", "Other"]), ("priority", ["High", "Medium", "Low"]),
+                              ("status", ["Pending", "Completed", "Overdue"])):
+            box = ctk.CTkComboBox(filter_frame, values=["All"] + values, width=130, command=lambda value: self.refresh_view())
+            box.set("All")
+            box.pack(side="left", padx=5)
+            self.filter_boxes[facet] = box
+
+        self.task_tree = ttk.Treeview(task_list_frame, columns=("Title", "Priority", "Due Date", "Category", "Status"), show="headings", selectmode="extended", style="Treeview")
 
         column_configs = [
             ("Title", 200),
@@ -286,17 +511,18 @@ class TaskManagerApp(BaseWindow):
             ("Status", 100)
         ]
         for col, width in column_configs:
-            self.task_tree.heading(col, text=col)
+            self.task_tree.heading(col, text=col, command=lambda col=col: self.sort_by(col))
             self.task_tree.column(col, anchor="center", width=width)
 
-        scrollbar = ttk.Scrollbar(task_list_frame, orient="vertical", command=self.task_tree.yview)
-        self.task_tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(task_list_frame, orient="vertical")
+        self.task_view = TaskListView(self.task_tree, scrollbar, overdue=self.service.reminders.overdue)
         self.task_tree.pack(expand=True, fill="both", padx=10, pady=10)
         scrollbar.pack(side="right", fill="y")
 
         button_frame = self.create_frame(task_list_frame)
         button_frame.pack(pady=10)
         buttons = [
+            ("Next Task", self.next_task),
             ("Complete", self.complete_task),
             ("Delete", self.delete_task),
             ("Edit", self.edit_task),
@@ -306,9 +532,39 @@ class TaskManagerApp(BaseWindow):
         for label, command in buttons:
             Utils.create_button(button_frame, label, command).pack(side="left", padx=5)
 
+        self.status_label = self.create_label(task_list_frame, "", font=("Helvetica", 11))
+        self.status_label.pack(pady=(0, 5))
+
     def toggle_appearance_mode(self, mode):
         ctk.set_appearance_mode(mode)
 
+    def toggle_metrics(self):
+        Metrics.enabled = bool(self.metrics_switch.get())
+        if self.metrics_job is not None: self.after_cancel(self.metrics_job)
+        self.metrics_job = None
+        if Metrics.enabled:
+            self.metrics_panel.pack(pady=5)
+            self.show_metrics()
+        else:
+            self.metrics_panel.pack_forget()
+
+    def show_metrics(self):
+        timings = Metrics.snapshot()["timings"]
+        lines = [f"{'':18}{'n':>5}{'p50':>7}{'p99':>7}"]
+        lines += [f"{name[:18]:18}{timing['count']:>5}{timing['p50_ms']:>7.1f}{timing['p99_ms']:>7.1f}"
+                  for name, timing in sorted(timings.items())]
+        self.metrics_text.delete("1.0", "end")
+        self.metrics_text.insert("1.0", "\n".join(lines) + "\n(milliseconds)")
+        self.metrics_job = self.after(self.METRICS_INTERVAL, self.show_metrics)
+
+    def export_metrics(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path: return
+        try:
+            Metrics.export(path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e))
+
     def add_task(self):
         title = self.title_entry.get()
         description = self.desc_entry.get()
@@ -320,74 +576,93 @@ class TaskManagerApp(BaseWindow):
             messagebox.showwarning("Warning", "Task title cannot be empty")
             return
 
-        task = Task(title, description, due_date, priority, category)
-        self.tasks.enqueue(task)
-        self.save_tasks()
-        self.undo_stack.push(("add", task))
-        self.redo_stack = Stack()
+        try:
+            self.service.add(title, description, due_date, priority, category)
+        except ValueError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
 
         for entry in [self.title_entry, self.desc_entry, self.due_entry]:
             entry.delete(0, 'end')
 
-        self.load_task_list()
+    def show_tasks(self, tasks):
+        if self.view_derived: self.schedule_refresh()
+        else: self.task_view.extend(tasks)
+        self.arm_reminder()
+
+    def arm_reminder(self):
+        # A single pending after() for the earliest upcoming due date; only re-armed when that moves.
+        deadline = self.service.reminders.next_deadline()
+        if deadline == self.reminder_deadline and self.reminder_job is not None: return
+        if self.reminder_job is not None: self.after_cancel(self.reminder_job)
+        self.reminder_job, self.reminder_deadline = None, deadline
+        if deadline is None: return
+        delay = int((deadline - datetime.now()).total_seconds() * 1000) + 1
+        self.reminder_job = self.after(max(0, min(delay, self.REMINDER_MAX_DELAY)), self.fire_reminder)
+
+    def fire_reminder(self):
+        self.reminder_job = None
+        expired = self.service.reminders.advance()
+        if expired:
+            if self.view_derived: self.schedule_refresh()
+            else: self.task_view.update(expired)
+            titles = ", ".join(task.title for task in expired[:3]) + (" …" if len(expired) > 3 else "")
+            self.status_label.configure(text=f"{len(expired)} task(s) now overdue: {titles}")
+            self.bell()
+        self.arm_reminder()
+
+    def load_next_page(self):
+        tasks = self.service.load_page()
+        if tasks is None: return
+        self.show_tasks(tasks)
+        self.after(1, self.load_next_page)
+
+    def import_tasks(self):
+        path = filedialog.askopenfilename(filetypes=TaskFiles.FORMATS[:2])
+        if not path: return
+        self.import_batches = self.service.import_file(path)
+        self.import_next_batch()
+
+    def import_next_batch(self):
+        # One batch per Tk tick: the first rows show up immediately while the rest keep streaming in.
+        try:
+            tasks = next(self.import_batches, None)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            messagebox.showerror("Import Failed", f"{e}\n\nTasks read before this point were imported.")
+            return
+        if tasks is None: return
+        self.show_tasks(tasks)
+        self.after(1, self.import_next_batch)
 
-    def save_tasks(self):
-        with open(self.file_path, 'w') as file:
-            json.dump([task.to_dict() for task in self.tasks.items], file, indent=4)
+    def export_tasks(self):
+        path = filedialog.asksaveasfilename(defaultextension=".jsonl", filetypes=TaskFiles.FORMATS)
+        if not path: return
+        self.run_in_background(self.service.export, self.finish_export, path)
 
-    def load_tasks(self):
+    def finish_export(self, future):
         try:
-            with open(self.file_path, 'r') as file:
-                for task_dict in json.load(file):
-                    self.tasks.enqueue(Task.from_dict(task_dict))
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.tasks = Queue()
+            path = future.result()
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Export Failed", str(e))
+            return
+        messagebox.showinfo("Export", f"Tasks exported to {path}")
 
     def load_task_list(self):
-        for item in self.task_tree.get_children():
-            self.task_tree.delete(item)
-
-        for task in self.tasks.items:
-            status_symbol = "✅" if task.completed else "❌"
-            status_color = "green" if task.completed else "red"
-            self.task_tree.insert("", "end", values=(task.title, task.priority, task.due_date, task.category, status_symbol), tags=(status_color,))
+        self.task_view.reset(self.tasks)
 
-        self.task_tree.tag_configure("green", foreground="green")
-        self.task_tree.tag_configure("red", foreground="red")
+    def selected_tasks(self):
+        selected_items = self.task_tree.selection()
+        if not selected_items: messagebox.showwarning("Warning", "Please select a task")
+        return [self.tasks.get(task_id) for task_id in selected_items]
 
     def complete_task(self):
-        selected_item = self.task_tree.selection()
-        if not selected_item:
-            messagebox.showwarning("Warning", "Please select a task")
-            return
-
-        task_title = self.task_tree.item(selected_item)['values'][0]
-        for task in self.tasks.items:
-            if task.title == task_title:
-                self.undo_stack.push(("complete", task, task.completed))
-                self.redo_stack = Stack()
-                task.completed = not task.completed
-                break
-
-        self.save_tasks()
-        self.load_task_list()
+        # With several rows selected, completes them all, or reopens them if they are all completed already.
+        tasks = self.selected_tasks()
+        if tasks: self.service.complete_many(tasks, not all(task.completed for task in tasks))
 
     def delete_task(self):
-        selected_item = self.task_tree.selection()
-        if not selected_item:
-            messagebox.showwarning("Warning", "Please select a task")
-            return
-
-        task_title = self.task_tree.item(selected_item)['values'][0]
-        for task in self.tasks.items:
-            if task.title == task_title:
-                self.tasks.items.remove(task)
-                self.undo_stack.push(("delete", task))
-                self.redo_stack = Stack()
-                break
-
-        self.save_tasks()
-        self.load_task_list()
+        tasks = self.selected_tasks()
+        if tasks: self.service.delete_many(tasks)
 
     def edit_task(self):
         selected_item = self.task_tree.selection()
@@ -395,94 +670,113 @@ class TaskManagerApp(BaseWindow):
             messagebox.showwarning("Warning", "Please select a task")
             return
 
-        task_title = self.task_tree.item(selected_item)['values'][0]
-        for task in self.tasks.items:
-            if task.title == task_title:
-                edit_window = ctk.CTkToplevel(self)
-                edit_window.title("Edit Task")
-                edit_window.geometry("400x500")
-
-                self.create_label(edit_window, "Title").pack()
-                title_entry = Utils.create_entry(edit_window, "", width=300)
-                title_entry.insert(0, task.title)
-                title_entry.pack()
-
-                self.create_label(edit_window, "Description").pack()
-                desc_entry = Utils.create_entry(edit_window, "", width=300)
-                desc_entry.insert(0, task.description)
-                desc_entry.pack()
-
-                self.create_label(edit_window, "Due Date").pack()
-                due_entry = Utils.create_entry(edit_window, "", width=300)
-                due_entry.insert(0, task.due_date)
-                due_entry.pack()
-
-                self.create_label(edit_window, "Priority").pack()
-                priority_combo = ctk.CTkComboBox(edit_window, values=["High", "Medium", "Low"], width=300)
-                priority_combo.set(task.priority)
-                priority_combo.pack()
-
-                self.create_label(edit_window, "Category").pack()
-                category_combo = ctk.CTkComboBox(edit_window, values=["Work", "Personal", "Study", "Other"], width=300)
-                category_combo.set(task.category)
-                category_combo.pack()
-
-                def save_changes():
-                    task.title = title_entry.get()
-                    task.description = desc_entry.get()
-                    task.due_date = due_entry.get()
-                    task.priority = priority_combo.get()
-                    task.category = category_combo.get()
-                    self.save_tasks()
-                    self.load_task_list()
-                    edit_window.destroy()
-
-                Utils.create_button(edit_window, "Save Changes", save_changes).pack(pady=20)
-                break
-
-    def undo(self):
-        if self.undo_stack.is_empty():
-            messagebox.showinfo("Undo", "No actions to undo")
+        task = self.tasks.get(selected_item[0])
+        edit_window = ctk.CTkToplevel(self)
+        edit_window.title("Edit Task")
+        edit_window.geometry("400x500")
+
+        self.create_label(edit_window, "Title").pack()
+        title_entry = Utils.create_entry(edit_window, "", width=300)
+        title_entry.insert(0, task.title)
+        title_entry.pack()
+
+        self.create_label(edit_window, "Description").pack()
+        desc_entry = Utils.create_entry(edit_window, "", width=300)
+        desc_entry.insert(0, task.description)
+        desc_entry.pack()
+
+        self.create_label(edit_window, "Due Date").pack()
+        due_entry = Utils.create_entry(edit_window, "", width=300)
+        due_entry.insert(0, task.due_date)
+        due_entry.pack()
+
+        self.create_label(edit_window, "Priority").pack()
+        priority_combo = ctk.CTkComboBox(edit_window, values=["High", "Medium", "Low"], width=300)
+        priority_combo.set(task.priority)
+        priority_combo.pack()
+
+        self.create_label(edit_window, "Category").pack()
+        category_combo = ctk.CTkComboBox(edit_window, values=["Work", "Personal", "Study", "Other"], width=300)
+        category_combo.set(task.category)
+        category_combo.pack()
+
+        def save_changes():
+            try:
+                self.service.edit(task, title=title_entry.get(), description=desc_entry.get(), due_date=due_entry.get(),
+                                  priority=priority_combo.get(), category=category_combo.get())
+            except ValueError as e:
+                messagebox.showwarning("Warning", str(e), parent=edit_window)
+                return
+            except LookupError as e:
+                # sync() removed the task while the window was open; there is nothing left to edit.
+                messagebox.showwarning("Edit Task", str(e), parent=edit_window)
+            edit_window.destroy()
+
+        Utils.create_button(edit_window, "Save Changes", save_changes).pack(pady=20)
+
+    def undo(self): self.step_history(self.service.undo, "Undo")
+    def redo(self): self.step_history(self.service.redo, "Redo")
+
+    def step_history(self, step, title):
+        try:
+            if step() is None: messagebox.showinfo(title, f"No actions to {title.lower()}")
+        except LookupError as e:
+            messagebox.showwarning(title, str(e))
+
+    def on_tasks_changed(self, change, tasks, befores):
+        # Patches the list with one diff per batch; a filtered or sorted view is re-queried instead.
+        if change == "remove": self.task_view.delete(tasks)
+        elif self.view_derived: self.schedule_refresh()
+        elif change == "update": self.task_view.update(tasks)
+        elif len(tasks) == 1: self.task_view.insert(tasks[0], befores[0])
+        else: self.task_view.replace(self.tasks)
+        self.arm_reminder()
+
+    def schedule_refresh(self):
+        # Debounced: a burst of keystrokes (or of changes while a filtered view is shown) runs one query.
+        if self.refresh_job is not None: self.after_cancel(self.refresh_job)
+        self.refresh_job = self.after(self.SEARCH_DELAY, self.refresh_view)
+
+    def refresh_view(self):
+        if self.refresh_job is not None: self.after_cancel(self.refresh_job)
+        self.refresh_job = None
+        self.search_query = self.search_entry.get().strip()
+        selected = {facet: None if box.get() == "All" else box.get() for facet, box in self.filter_boxes.items()}
+        status = selected["status"] and selected["status"].lower()
+        self.view_derived = bool(self.search_query or any(selected.values()) or self.sort_column)
+        self.task_view.reset(self.service.query(self.search_query, selected["category"], selected["priority"], status,
+                                                self.sort_column, self.sort_descending))
+
+    def sort_by(self, column):
+        # Each header click cycles ascending, descending, then back to insertion order.
+        if column != self.sort_column:
+            self.sort_column, self.sort_descending = column, False
+        elif not self.sort_descending:
+            self.sort_descending = True
+        else:
+            self.sort_column = None
+        for col in FacetIndex.SORT_KEYS:
+            arrow = (" ▼" if self.sort_descending else " ▲") if col == self.sort_column else ""
+            self.task_tree.heading(col, text=col + arrow)
+        self.refresh_view()
+
+    def clear_view(self):
+        self.search_entry.delete(0, 'end')
+        for box in self.filter_boxes.values():
+            box.set("All")
+        self.refresh_view()
+
+    def next_task(self):
+        task = self.service.next_task()
+        if task is None:
+            messagebox.showinfo("Next Task", "No pending tasks")
             return
 
-        action = self.undo_stack.pop()
-        if action[0] == "add":
-            task = action[1]
-            self.tasks.items.remove(task)
-            self.redo_stack.push(("add", task))
-        elif action[0] == "delete":
-            task = action[1]
-            self.tasks.enqueue(task)
-            self.redo_stack.push(("delete", task))
-        elif action[0] == "complete":
-            task, previous_state = action[1], action[2]
-            task.completed = previous_state
-            self.redo_stack.push(("complete", task, not previous_state))
-
-        self.save_tasks()
-        self.load_task_list()
+        if self.view_derived and task not in self.task_view.rows:
+            self.clear_view()
 
-    def redo(self):
-        if self.redo_stack.is_empty():
-            messagebox.showinfo("Redo", "No actions to redo")
-            return
-
-        action = self.redo_stack.pop()
-        if action[0] == "add":
-            task = action[1]
-            self.tasks.enqueue(task)
-            self.undo_stack.push(("add", task))
-        elif action[0] == "delete":
-            task = action[1]
-            self.tasks.items.remove(task)
-            self.undo_stack.push(("delete", task))
-        elif action[0] == "complete":
-            task, previous_state = action[1], action[2]
-            task.completed = not previous_state
-            self.undo_stack.push(("complete", task, previous_state))
-
-        self.save_tasks()
-        self.load_task_list()
+        self.task_view.show(task)
+        self.task_tree.selection_set(task.id)
 
 class LandingPage(BaseWindow):
     def __init__(self):
@@ -545,7 +839,8 @@ class LandingPage(BaseWindow):
 def main():
     try:
         with DatabaseManager() as db:
-            db.add_user("testuser", "password123")
+            # Seed the demo account once; add_user always pays the password KDF, even for a duplicate.
+            if not db.has_user("testuser"): db.add_user("testuser", "password123")
         landing_page = LandingPage()
         landing_page.mainloop()
     except sqlite3.Error as e:
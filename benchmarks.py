@@ -0,0 +1,751 @@
+from datetime import date, datetime
+import argparse, cProfile, json, multiprocessing, os, platform, random, sqlite3, subprocess, sys, tempfile, threading, time, tracemalloc
+from contextlib import contextmanager
+from task_service import (Task, TaskTable, Queue, TaskQueue, Stack, SearchIndex, FacetIndex, Reminders, EditTasks, History,
+                          TaskRepository, TaskService, DatabaseManager, ConnectionPool, PasswordHasher, Metrics)
+
+SIZES = (1_000, 10_000, 100_000)
+TITLES = None
+PRIORITIES = ["High", "Medium", "Low"]
+CATEGORIES = ["Work", "Personal", "Study", "Other"]
+WORDS = ("report meeting invoice review groceries laundry exercise dentist budget presentation email call "
+         "project deadline homework reading payment renewal backup cleanup planning research draft release "
+         "garden repair travel booking insurance taxes doctor birthday").split()
+
+def make_tasks(count, seed=0, titles=None, categories=CATEGORIES):
+    # titles, when set, is how many distinct titles the tasks share, so titles collide.
+    rng = random.Random(seed)
+    pool = [f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}" for i in range(titles or 0)]
+    return [Task(pool[rng.randrange(titles)] if pool else f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                 " ".join(rng.choices(WORDS, k=5)), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                 rng.choice(PRIORITIES), rng.choice(categories))
+            for i in range(count)]
+
+class HeadlessTree:
+    # Stand-in for the ttk.Treeview calls TaskListView makes, so the list view runs without a display.
+    def __init__(self, height=20):
+        self.height = height
+        self.children = []
+        self.items = {}
+
+    def cget(self, option): return self.height
+    def configure(self, **options): pass
+    def bind(self, sequence, handler, add=None): pass
+    def tag_configure(self, tag, **options): pass
+    def yview_moveto(self, fraction): pass
+    def get_children(self): return tuple(self.children)
+    def exists(self, iid): return iid in self.items
+    def item(self, iid, **options): self.items[iid].update(options)
+
+    def insert(self, parent, position, iid, **options):
+        self.children.insert(position, iid)
+        self.items[iid] = options
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+        self.children = [iid for iid in self.children if iid in self.items]
+
+class HeadlessScrollbar:
+    def configure(self, **options): pass
+    def set(self, low, high): pass
+
+class HeadlessCanvas:
+    # Stand-in for the tk.Canvas calls the login animation makes; calls counts the round-trips Tk would see.
+    def __init__(self):
+        self.items = {}
+        self.calls = 0
+
+    def create_oval(self, *coords, tags=(), **options):
+        self.items[len(self.items) + 1] = (list(coords), tags)
+        return len(self.items)
+
+    def move(self, target, dx, dy):
+        self.calls += 1
+        for item, (coords, tags) in self.items.items():
+            if item == target or target in tags:
+                coords[0] += dx; coords[1] += dy; coords[2] += dx; coords[3] += dy
+
+    def coords(self, item, *coords):
+        self.calls += 1
+        if not coords: return list(self.items[item][0])
+        self.items[item][0][:] = coords
+
+class ListQueue:
+    # The list-backed Queue this repo shipped before the linked-list engine, kept as a baseline.
+    def __init__(self): self.items = []
+    def enqueue(self, item): self.items.append(item)
+    def dequeue(self): return self.items.pop(0) if self.items else None
+
+@contextmanager
+def default_kdf(kdf):
+    previous, PasswordHasher.default_kdf = PasswordHasher.default_kdf, kdf
+    try:
+        yield
+    finally:
+        PasswordHasher.default_kdf = previous
+
+def validate_user_per_connection(db_name, username, password):
+    # How DatabaseManager authenticated before the pool: connect, ensure the schema, query, close.
+    conn = sqlite3.connect(db_name)
+    conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL)")
+    conn.commit()
+    row = conn.execute("SELECT id FROM users WHERE username=? AND password=?", (username, PasswordHasher.derive(password, "", "sha256"))).fetchone()
+    conn.close()
+    return row
+
+def validate_user_pooled(db_name, username, password):
+    with DatabaseManager(db_name) as db:
+        return db.validate_user(username, password)
+
+class DictTask:
+    # The __dict__-based Task this repo shipped before slots, kept as a baseline.
+    def __init__(self, title, description, due_date, priority, category, task_id=None):
+        self.id = task_id
+        self.title = title
+        self.description = description
+        self.due_date = due_date
+        self.priority = priority
+        self.category = category
+        self.completed = False
+
+    def to_dict(self):
+        return {"id": self.id, "title": self.title, "description": self.description, "due_date": self.due_date,
+                "priority": self.priority, "category": self.category, "completed": self.completed}
+
+    @classmethod
+    def from_dict(cls, task_dict):
+        task = cls(task_dict.get("title", ""), task_dict.get("description", ""), task_dict.get("due_date", ""),
+                   task_dict.get("priority", "Low"), task_dict.get("category", "Other"), task_dict.get("id"))
+        task.completed = task_dict["completed"]
+        return task
+
+def per_action(action, targets):
+    start = time.perf_counter()
+    for target in targets:
+        action(target)
+    return (time.perf_counter() - start) / len(targets) * 1e6
+
+def find_by_title(tasks, title):
+    for task in tasks:
+        if task.title == title:
+            return task
+
+def bench_identity_index(size, actions=200):
+    tasks = TaskQueue()
+    for task in make_tasks(size):
+        tasks.enqueue(task)
+    targets = random.Random(1).sample(list(tasks), actions)
+
+    def complete_by_title(task): find_by_title(tasks, task.title).completed ^= True
+    def complete_by_id(task): tasks.get(task.id).completed ^= True
+    def delete_by_title(task): tasks.remove(find_by_title(tasks, task.title))
+    def delete_by_id(task): tasks.remove(tasks.get(task.id))
+
+    results = {
+        "complete/title scan": per_action(complete_by_title, targets),
+        "complete/id index": per_action(complete_by_id, targets),
+    }
+    results["delete/title scan"] = per_action(delete_by_title, targets)
+    for task in targets:
+        tasks.enqueue(task)
+    results["delete/id index"] = per_action(delete_by_id, targets)
+    return results
+
+def bench_queue_engine(size, removals=1_000):
+    results = {}
+    for name, queue_class in (("list", ListQueue), ("linked", Queue)):
+        items = list(range(size))
+        queue = queue_class()
+        start = time.perf_counter()
+        handles = [queue.enqueue(item) for item in items]
+        results[f"enqueue/{name}"] = (time.perf_counter() - start) / size * 1e6
+
+        victims = random.Random(2).sample(range(size), min(removals, size // 2))
+        if queue_class is ListQueue:
+            results[f"remove/{name}"] = per_action(queue.items.remove, victims)
+        else:
+            results[f"remove/{name}"] = per_action(lambda item: queue.unlink(handles[item]), victims)
+
+        remaining = size - len(victims)
+        start = time.perf_counter()
+        while queue.dequeue() is not None:
+            pass
+        results[f"dequeue/{name}"] = (time.perf_counter() - start) / remaining * 1e6
+    return results
+
+def bench_user_partitions(user_sizes=(10, 1_000, 50_000), users_per_size=(200, 20, 2), page_size=200):
+    # Load test: many users of mixed sizes share one database; per-user cost should track the
+    # user's own task count, not the total.
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "users.db")
+        owner = 0
+        owners_by_size = {}
+        for size, users in zip(user_sizes, users_per_size):
+            for _ in range(users):
+                owner += 1
+                repository = TaskRepository(db_name, owner)
+                repository.add_many(make_tasks(size, seed=owner))
+                repository.close()
+                owners_by_size.setdefault(size, []).append(owner)
+
+        for size, owners in owners_by_size.items():
+            repository = TaskRepository(db_name, owners[0])
+            start = time.perf_counter()
+            pages = repository.pages(page_size)
+            first_page = next(pages)
+            first_page_time = time.perf_counter() - start
+            sum(len(page) for page in pages)
+            full_load_time = time.perf_counter() - start
+
+            tasks = first_page
+            start = time.perf_counter()
+            for task in tasks:
+                task.completed = not task.completed
+                repository.update(task)
+            update_time = (time.perf_counter() - start) / len(tasks)
+            repository.close()
+            results[size] = {"first page": first_page_time * 1e6, "full load": full_load_time * 1e6,
+                             "update one task": update_time * 1e6}
+        ConnectionPool.get(db_name).close()
+    return results
+
+def bench_login_throughput(thread_counts=(1, 4, 8), logins_per_thread=500, users=100):
+    # Uses the legacy unsalted hash so the comparison measures connection handling, not KDF cost.
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, default_kdf("sha256"):
+        db_name = os.path.join(directory, "users.db")
+        with DatabaseManager(db_name) as db:
+            for user in range(users):
+                db.add_user(f"user{user}", "password")
+
+        for name, validate in (("per-connection", validate_user_per_connection), ("pooled", validate_user_pooled)):
+            for threads in thread_counts:
+                def worker(seed):
+                    rng = random.Random(seed)
+                    for _ in range(logins_per_thread):
+                        validate(db_name, f"user{rng.randrange(users)}", "password")
+
+                workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+                start = time.perf_counter()
+                for thread in workers: thread.start()
+                for thread in workers: thread.join()
+                elapsed = time.perf_counter() - start
+                results.setdefault(threads, {})[f"logins/s {name}"] = threads * logins_per_thread / elapsed
+        ConnectionPool.get(db_name).close()
+    return results
+
+def stress_worker(db_name, user_id, operations, seed, barrier, results):
+    # One process of bench_shared_store: random adds, edits and deletes, polling sync() every few
+    # operations as the dashboard does. Once every process is done it syncs a last time and reports
+    # what it holds, to be checked against the database.
+    service = TaskService(user_id, db_name)
+    service.load_all()
+    rng = random.Random(seed)
+    merged, polls, sync_time = 0, 0, 0.0
+    start = time.perf_counter()
+    for operation in range(operations):
+        tasks = list(service.tasks)
+        action = rng.random()
+        if action < 0.3 or not tasks:
+            service.add(f"Task {seed}-{operation}", priority=rng.choice(PRIORITIES), category=rng.choice(CATEGORIES))
+        elif action < 0.85:
+            task = rng.choice(tasks)
+            if rng.random() < 0.5: service.complete_many([task], not task.completed)
+            else: service.edit(task, title=f"{task.title.split(' (')[0]} ({seed}-{operation})")
+        else:
+            service.delete_many([rng.choice(tasks)])
+        if operation % 5 == 0:
+            sync_start = time.perf_counter()
+            merged += service.sync()
+            sync_time += time.perf_counter() - sync_start
+            polls += 1
+    service.writer.flush()
+    elapsed = time.perf_counter() - start
+    barrier.wait()
+    service.sync()
+    snapshot = sorted((task.to_row(), task.version) for task in service.tasks)
+    results.put((operations / elapsed, service.writer.stats["conflicts"], merged, sync_time / polls * 1e6, snapshot))
+    service.close()
+
+def bench_shared_store(process_counts=(2, 4, 8), operations=300, tasks=200):
+    # Several processes sharing one account's tasks: throughput, how many writes lost a version race,
+    # merge cost, and whether every process ends up holding exactly what is stored.
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for processes in process_counts:
+            db_name = os.path.join(directory, f"shared-{processes}.db")
+            with DatabaseManager(db_name) as db:
+                db.add_user("shared", "password")
+                user_id = db.validate_user("shared", "password")
+            repository = TaskRepository(db_name, user_id)
+            repository.add_many(make_tasks(tasks))
+            barrier, reported = context.Barrier(processes), context.Queue()
+            workers = [context.Process(target=stress_worker, args=(db_name, user_id, operations, seed, barrier, reported))
+                       for seed in range(processes)]
+            for worker in workers: worker.start()
+            reports = [reported.get() for _ in workers]
+            for worker in workers: worker.join()
+            stored = sorted((task.to_row(), task.version) for page in repository.pages(1000) for task in page)
+            repository.close()
+            ConnectionPool.get(db_name).close()
+            results[f"{processes} processes"] = {
+                "ops/s per process": sum(report[0] for report in reports) / processes,
+                "conflicts (% of ops)": sum(report[1] for report in reports) / (processes * operations) * 100,
+                "merged per process": sum(report[2] for report in reports) / processes,
+                "sync per poll (us)": sum(report[3] for report in reports) / processes,
+                "converged processes": sum(report[4] == stored for report in reports)}
+    return results
+
+def bench_password_kdfs(kdfs=("sha256", "pbkdf2_sha256:100000", "pbkdf2_sha256:600000", "scrypt:16384:8:1", "scrypt:65536:8:1"),
+                        logins=5):
+    results = {"login latency (ms)": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "users.db")
+        for kdf in kdfs:
+            with default_kdf(kdf), DatabaseManager(db_name) as db:
+                db.add_user(kdf, "password")
+                start = time.perf_counter()
+                for _ in range(logins):
+                    db.validate_user(kdf, "password")
+                results["login latency (ms)"][kdf] = (time.perf_counter() - start) / logins * 1e3
+        ConnectionPool.get(db_name).close()
+    return results
+
+def bench_search(size, queries=("r", "re", "rep", "report", "report mee", "budget taxes dr", "12345")):
+    tasks = make_tasks(size)
+    index = SearchIndex()
+    start = time.perf_counter()
+    for task in tasks:
+        index.add(task)
+    results = {"index build (per task)": (time.perf_counter() - start) / size * 1e6}
+    for query in queries:
+        results[f"query '{query}'"] = per_action(index.search, [query] * 20)
+    results["update (per task)"] = per_action(index.update, tasks[:1000])
+    return results
+
+def bench_facets(size):
+    # "Work + High + overdue", then sorted by due date: a full scan and sort against the maintained indexes.
+    # Due dates run from two months back to ten months ahead, so about a sixth of the tasks are overdue.
+    tasks = make_tasks(size)
+    today = date.today().toordinal()
+    rng = random.Random(2)
+    for task in tasks:
+        task.due_date = date.fromordinal(today + rng.randint(-60, 300)).isoformat()
+    for task in tasks[::3]:
+        task.completed = True
+    index = FacetIndex()
+    start = time.perf_counter()
+    index.add_many(tasks)
+    index.column("Due Date")
+    results = {"index build (per task)": (time.perf_counter() - start) / size * 1e6}
+
+    def scan(_):
+        matches = [task for task in tasks if task.category == "Work" and task.priority == "High"
+                   and not task.completed and task.due_ordinal < today]
+        return sorted(matches, key=lambda task: task.due_ordinal)
+    def indexed(_):
+        return index.ordered("Due Date", False, index.filter(category="Work", priority="High", overdue=True))
+
+    results["filter+sort/scan"] = per_action(scan, range(20))
+    results["filter+sort/index"] = per_action(indexed, range(20))
+    results["overdue/scan"] = per_action(lambda _: [task for task in tasks if not task.completed and task.due_ordinal < today], range(20))
+    results["overdue/index"] = per_action(lambda _: index.filter(overdue=True), range(20))
+    results["sort all/sorted()"] = per_action(lambda _: sorted(tasks, key=lambda task: task.title.lower()), range(5))
+    results["sort all/index"] = per_action(lambda _: index.ordered("Title"), range(5))
+    results["update (per task)"] = per_action(index.update, tasks[:1000])
+    def complete(task):
+        task.completed = not task.completed
+        index.update(task)
+    results["complete (per task)"] = per_action(complete, tasks[:1000])
+    return results
+
+def bench_reminders(size):
+    # Due dates a year either side of today: a per-tick scan for newly overdue tasks against the
+    # deadline heap, which a tick with nothing due only peeks at.
+    tasks = make_tasks(size)
+    today = date.today()
+    rng = random.Random(1)
+    for task in tasks:
+        task.due_date = date.fromordinal(today.toordinal() + rng.randint(-365, 365)).isoformat()
+    reminders = Reminders()
+    results = {"track (per task)": per_action(reminders.track, tasks)}
+
+    def scan(_):
+        ordinal = date.today().toordinal()
+        return [task for task in tasks if not task.completed and task.due_ordinal < ordinal]
+    def edit(task):
+        task.due_date = date.fromordinal(task.due_ordinal + 1).isoformat()
+        reminders.track(task)
+
+    results["tick/scan"] = per_action(scan, range(20))
+    results["tick/heap"] = per_action(lambda _: (reminders.advance(), reminders.next_deadline()), range(1000))
+    results["edit due date"] = per_action(edit, tasks[:1000])
+    return results
+
+def bench_batches(size=100_000, batch=10_000):
+    # Completing then deleting a 10k selection out of 100k tasks, one task at a time (the old per-row
+    # actions) against one batch. "undo history" is the saved size of the entries the actions leave.
+    tasks = make_tasks(size)
+    selection = random.Random(3).sample(tasks, batch)
+    results = {"per task": {}, "batched": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in results:
+            repository = TaskRepository(os.path.join(directory, f"{name}.db"), 1)
+            repository.add_many(tasks)
+            index = FacetIndex()
+            index.add_many(tasks)
+            index.column("Title")
+            history = History(limit=batch)
+            for task in selection:
+                task.completed = False
+
+            start = time.perf_counter()
+            if name == "per task":
+                for task in selection:
+                    history.record(EditTasks.diff([task], completed=True))
+                    task.completed = True
+                    index.update(task)
+            else:
+                history.record(EditTasks.diff(selection, completed=True))
+                for task in selection:
+                    task.completed = True
+                index.update_many(selection)
+            results[name]["complete/index (ms)"] = (time.perf_counter() - start) * 1e3
+
+            start = time.perf_counter()
+            if name == "per task":
+                for task in selection:
+                    repository.update(task)
+            else:
+                repository.apply([("update", task.to_row(), task.version, task.seq) for task in selection])
+            results[name]["complete/store (ms)"] = (time.perf_counter() - start) * 1e3
+
+            start = time.perf_counter()
+            if name == "per task":
+                for task in selection:
+                    index.remove(task)
+            else:
+                index.remove_many(selection)
+            results[name]["delete/index (ms)"] = (time.perf_counter() - start) * 1e3
+            results[name]["undo history (KB)"] = len(history.dump()) / 1024
+            repository.close()
+            ConnectionPool.get(repository.db_name).close()
+    return results
+
+def bench_startup(runs=5):
+    # Cold-start cost of a scripted job: importing the headless service against importing the GUI module.
+    # Run from the repo directory so the modules import no matter where the benchmarks were started.
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {"import (ms)": {}}
+    for module in ("task_service", "Sample1"):
+        start = time.perf_counter()
+        for _ in range(runs):
+            subprocess.run([sys.executable, "-c", f"import {module}"], check=True, cwd=here)
+        results["import (ms)"][module] = (time.perf_counter() - start) / runs * 1e3
+    return results
+
+def bench_metrics(calls=200_000):
+    # Cost per call of the timed() wrapper around a trivial function, with collection off and on.
+    def work(): pass
+    timed = Metrics.timed("bench.work")(work)
+    enabled = Metrics.enabled
+    results = {"nanoseconds per call": {}}
+    try:
+        for name, function, collect in (("plain", work, False), ("timed, disabled", timed, False), ("timed, enabled", timed, True)):
+            Metrics.enabled = collect
+            start = time.perf_counter()
+            for _ in range(calls):
+                function()
+            results["nanoseconds per call"][name] = (time.perf_counter() - start) / calls * 1e9
+    finally:
+        Metrics.enabled = enabled
+        Metrics.histograms.pop("bench.work", None)
+    return results
+
+def legacy_particles(canvas, count, rng):
+    # The login animation as first written: one oval per particle, moved and read back one at a time.
+    particles = []
+    for _ in range(count):
+        x, y, size = rng.randint(0, 600), rng.randint(0, 500), rng.randint(1, 3)
+        particles.append((canvas.create_oval(x, y, x + size, y + size, fill="white", stipple="gray50"), rng.uniform(0.5, 2)))
+    def frame():
+        for particle, speed in particles:
+            canvas.move(particle, 0, speed)
+            coords = canvas.coords(particle)
+            if coords[1] > 500:
+                canvas.coords(particle, coords[0], 0, coords[2], coords[3] - coords[1])
+    return frame
+
+def bench_particles(real_tk=False, counts=(50, 500), frames=2_000):
+    # Tk calls per animation frame: per-particle move and coords against one move per speed lane. The headless
+    # canvas only counts calls, so CPU time per frame is measured with --tk, against a real canvas.
+    from Sample1 import ParticleField
+    if real_tk:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    results = {}
+    for count in counts:
+        column = results[f"{count} particles"] = {}
+        for name in ("per particle", "tagged lanes"):
+            canvas = tk.Canvas(root, width=600, height=600) if real_tk else HeadlessCanvas()
+            rng = random.Random(7)
+            frame = legacy_particles(canvas, count, rng) if name == "per particle" else ParticleField(canvas, 600, 500, count, rng).step
+            calls = getattr(canvas, "calls", 0)
+            start = time.process_time()
+            for _ in range(frames):
+                frame()
+            if real_tk: column[f"{name}/CPU us"] = (time.process_time() - start) / frames * 1e6
+            else: column[f"{name}/Tk calls"] = (canvas.calls - calls) / frames
+    if real_tk: root.destroy()
+    return results
+
+def measure(build):
+    tracing = tracemalloc.is_tracing()
+    if not tracing: tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0] - before
+    if not tracing: tracemalloc.stop()
+    return result, elapsed, size
+
+def bench_stack(size):
+    results = {}
+    for name, limit in (("unbounded", None), ("capped 200", 200)):
+        stack = Stack(limit)
+        results[f"push/{name}"] = per_action(stack.push, range(size))
+        results[f"pop/{name}"] = per_action(lambda _: stack.pop(), range(min(size, limit or size)))
+    return results
+
+def bench_persistence(size, users=None):
+    # The store as data grows: bulk save, the first page the dashboard waits for, loading everything
+    # into a TaskService, the write-behind path, and a login against a users table of the same size.
+    tasks = make_tasks(size, titles=TITLES)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, default_kdf("sha256"):
+        db_name = os.path.join(directory, "users.db")
+        repository = TaskRepository(db_name, 1)
+        start = time.perf_counter()
+        repository.add_many(tasks)
+        results["save all (per task)"] = (time.perf_counter() - start) / size * 1e6
+        repository.close()
+
+        service = TaskService(1, db_name)
+        start = time.perf_counter()
+        service.load_page()
+        results["first page (ms)"] = (time.perf_counter() - start) * 1e3
+        service.load_all()
+        results["load all (per task)"] = (time.perf_counter() - start) / size * 1e6
+        updates = tasks[:min(size, 10_000)]
+        start = time.perf_counter()
+        for task in updates:
+            service.writer.update(task)
+        service.writer.flush()
+        results["write-behind (per task)"] = (time.perf_counter() - start) / len(updates) * 1e6
+        service.close()
+
+        with DatabaseManager(db_name) as db:
+            digest = PasswordHasher.derive("password", "", "sha256")
+            db.cursor.executemany("INSERT INTO users (username, password, salt, kdf) VALUES (?, ?, '', 'sha256')",
+                                  ((f"user{user}", digest) for user in range(users or size)))
+            db.conn.commit()
+            rng = random.Random(4)
+            results["validate_user"] = per_action(lambda user: db.validate_user(f"user{user}", "password"),
+                                                  [rng.randrange(users or size) for _ in range(200)])
+        ConnectionPool.get(db_name).close()
+    return results
+
+def make_task_list(real_tk=False):
+    from Sample1 import TaskListView  # only the list view; customtkinter is imported but no window is made
+    if not real_tk:
+        return TaskListView(HeadlessTree(), HeadlessScrollbar(), row_height=20)
+    import tkinter as tk
+    from tkinter import ttk
+    root = tk.Tk()
+    root.withdraw()
+    return TaskListView(ttk.Treeview(root, columns=("Title", "Priority", "Due Date", "Category", "Status"), show="headings", height=20),
+                        ttk.Scrollbar(root))
+
+def bench_task_list(size, real_tk=False):
+    tasks = make_tasks(size, titles=TITLES)
+    view = make_task_list(real_tk)
+    results = {}
+    start = time.perf_counter()
+    view.reset(tasks)
+    results["load list (ms)"] = (time.perf_counter() - start) * 1e3
+    rng = random.Random(5)
+    results["scroll"] = per_action(view.scroll_to, [rng.randrange(size) for _ in range(200)])
+    visible = view.rows[view.start:view.end]
+    results["update visible row"] = per_action(lambda task: view.update([task]), visible)
+    results["delete one"] = per_action(lambda task: view.delete([task]), rng.sample(tasks, 50))
+    start = time.perf_counter()
+    view.delete(rng.sample(view.rows, len(view.rows) // 10))
+    results["delete 10% (ms)"] = (time.perf_counter() - start) * 1e3
+    return results
+
+def bench_service(size):
+    # The dashboard's operations end to end through TaskService, minus the widgets.
+    tasks = make_tasks(size, titles=TITLES)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "users.db")
+        service = TaskService(1, db_name)
+        start = time.perf_counter()
+        service.add_many(tasks)
+        results["add_many (per task)"] = (time.perf_counter() - start) / size * 1e6
+        selection = random.Random(6).sample(list(service.tasks), size // 10)
+        for name, action in (("complete_many 10%", lambda: service.complete_many(selection)), ("undo", service.undo),
+                             ("delete_many 10%", lambda: service.delete_many(selection)), ("undo delete", service.undo),
+                             ("query Work+High", lambda: service.query(category="Work", priority="High")),
+                             ("query search+sort", lambda: service.query("rep", sort="Due Date")),
+                             ("next task", service.next_task)):
+            start = time.perf_counter()
+            action()
+            results[f"{name} (ms)"] = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        service.close()
+        results["close/flush (ms)"] = (time.perf_counter() - start) * 1e3
+        ConnectionPool.get(db_name).close()
+    return results
+
+def bench_task_representation(size):
+    # Rows arrive as tuples from SQLite; "load" builds the in-memory form and "save" turns it back
+    # into what the store writes. Bytes are what the in-memory form itself keeps alive.
+    rows = [task.to_row() for task in make_tasks(size)]
+    results = {}
+    representations = (
+        ("dict Task", lambda: [DictTask.from_dict(dict(zip(Task.FIELDS, row))) for row in rows], lambda tasks: [task.to_dict() for task in tasks]),
+        ("slots Task", lambda: [Task.from_row(row) for row in rows], lambda tasks: [task.to_row() for task in tasks]),
+        ("TaskTable", lambda: build_table(rows), lambda table: list(table.rows())),
+    )
+    for name, load, save in representations:
+        loaded, load_time, memory = measure(load)
+        start = time.perf_counter()
+        save(loaded)
+        save_time = time.perf_counter() - start
+        results[f"load/{name}"] = load_time / size * 1e6
+        results[f"save/{name}"] = save_time / size * 1e6
+        results[f"bytes/{name}"] = memory / size
+        del loaded
+    return results
+
+def build_table(rows):
+    table = TaskTable()
+    for row in rows:
+        table.append_row(row)
+    return table
+
+def report(name, results_by_size, unit="microseconds per action"):
+    print(f"\n{name} ({unit})")
+    labels = list(next(iter(results_by_size.values())))
+    widths = [12 if isinstance(size, int) else len(size) + 4 for size in results_by_size]
+    print(f"{'':24}" + "".join(f"{size:>{width},}" if isinstance(size, int) else f"{size:>{width}}"
+                               for size, width in zip(results_by_size, widths)))
+    for label in labels:
+        print(f"{label:24}" + "".join(f"{results[label]:>{width}.2f}" for results, width in zip(results_by_size.values(), widths)))
+
+# name: (title, function, unit, runs once per size)
+BENCHMARKS = {
+    "selection": ("Selection lookups", bench_identity_index, "microseconds per action", True),
+    "queue": ("Queue engine", bench_queue_engine, "microseconds per action", True),
+    "stack": ("Stack", bench_stack, "microseconds per action", True),
+    "search": ("Search", bench_search, "microseconds per action", True),
+    "facets": ("Filter and sort", bench_facets, "microseconds per action", True),
+    "reminders": ("Due-date reminders", bench_reminders, "microseconds per action", True),
+    "list": ("Task list view", bench_task_list, "microseconds per action", True),
+    "service": ("TaskService operations", bench_service, "microseconds per action", True),
+    "persistence": ("Store and login as data grows", bench_persistence, "microseconds per action", True),
+    "representation": ("Task representation", bench_task_representation,
+                       "load/save in microseconds per task, bytes retained per task", True),
+    "batches": ("Batch of 10,000 out of 100,000 tasks", bench_batches, "milliseconds, kilobytes", False),
+    "particles": ("Login animation per frame", bench_particles, "Tk calls; CPU microseconds with --tk", False),
+    "startup": ("Startup by entry module", bench_startup, "milliseconds", False),
+    "metrics": ("Instrumentation overhead", bench_metrics, "nanoseconds", False),
+    "partitions": ("Per-user load by user size", bench_user_partitions, "microseconds per action", False),
+    "shared": ("Processes sharing one account", bench_shared_store, "per process", False),
+    "logins": ("Concurrent logins by thread count", bench_login_throughput, "logins per second", False),
+    "kdfs": ("Login latency by password KDF cost", bench_password_kdfs, "milliseconds", False),
+}
+HIGHER_IS_BETTER = ("logins/s", "ops/s", "converged")
+
+def run(name, function, args, profile_dir=None, memory=False):
+    # Returns the function's results and its peak traced memory in MB (None unless memory is set).
+    profiler = cProfile.Profile() if profile_dir else None
+    if memory: tracemalloc.start()
+    if profiler: profiler.enable()
+    try:
+        results = function(*args)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if memory else None
+        if memory: tracemalloc.stop()
+    return results, peak
+
+def compare(current, baseline, tolerance):
+    # Every metric present in both runs that got worse by more than tolerance (0.2 = 20%).
+    regressions = []
+    for name, bench in current.items():
+        old = baseline.get(name, {}).get("results", {})
+        for column, values in bench["results"].items():
+            for label, value in values.items():
+                before = old.get(column, {}).get(label)
+                if not before or not value: continue
+                change = before / value - 1 if label.startswith(HIGHER_IS_BETTER) else value / before - 1
+                if change > tolerance: regressions.append((name, column, label, before, value, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the task engine, storage and list view.")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="task counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--titles", type=int, help="number of distinct task titles; fewer means more collisions")
+    parser.add_argument("--memory", action="store_true", help="record peak traced memory (slows the timed code)")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile .prof file per benchmark and size to DIR")
+    parser.add_argument("--tk", action="store_true", help="drive a real ttk.Treeview and tk.Canvas (needs a display, e.g. xvfb-run)")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="JSON from an earlier run; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before --compare fails (default 0.2)")
+    args = parser.parse_args(argv)
+    unknown = set(args.names).difference(BENCHMARKS)
+    if unknown: parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    global TITLES
+    TITLES = args.titles
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if args.profile: os.makedirs(args.profile, exist_ok=True)
+    output = {}
+    for name in args.names or BENCHMARKS:
+        title, function, unit, sized = BENCHMARKS[name]
+        extra = (args.tk,) if function in (bench_task_list, bench_particles) else ()
+        if sized:
+            results, peaks = {}, {}
+            for size in sizes:
+                results[size], peaks[size] = run(f"{name}-{size}", function, (size,) + extra, args.profile, args.memory)
+        else:
+            (results, peak), peaks = run(name, function, extra, args.profile, args.memory), None
+            if args.memory: peaks = {column: peak for column in results}
+        report(title, results, unit)
+        if args.memory: print(f"{'peak memory (MB)':24}" + "".join(f"{peak:>12.1f}" for peak in peaks.values()))
+        output[name] = {"title": title, "unit": unit, "results": {str(column): values for column, values in results.items()}}
+        if args.memory: output[name]["peak_memory_mb"] = {str(column): peak for column, peak in peaks.items()}
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "machine": platform.platform(), "sizes": sizes, "titles": TITLES, "benchmarks": output}, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(output, json.load(file)["benchmarks"], args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} against {args.compare}")
+        for name, column, label, before, value, change in regressions:
+            print(f"  {name} [{column}] {label}: {before:.2f} -> {value:.2f} ({change:+.0%})")
+        if regressions: sys.exit(1)
+
+if __name__ == "__main__": main()
@@ -0,0 +1,1684 @@
+from datetime import date, datetime
+import argparse, atexit, csv, getpass, json, math, sqlite3, hashlib, hmac, os, re, sys, threading, uuid, queue, time, zlib
+from collections import deque
+from functools import wraps
+from bisect import bisect_left, insort
+from array import array
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+class Histogram:
+    # Log-bucketed latencies: each bucket is 2^(1/8) (about 9%) wider than the last, starting at 1 µs,
+    # so recording is O(1), memory stays small however many samples arrive, and a percentile is
+    # accurate to within one bucket.
+    __slots__ = ("buckets", "count", "total", "max")
+    GROWTH = 2 ** 0.125
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = self.max = 0.0
+
+    def record(self, seconds):
+        bucket = max(0, math.ceil(math.log(seconds * 1e6, self.GROWTH))) if seconds > 0 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the sample at that rank, in seconds.
+        rank, seen = fraction * self.count, 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank: return min(self.max, 1e-6 * self.GROWTH ** bucket)
+        return self.max
+
+class Metrics:
+    # Process-wide counters and latency histograms for the hot paths. Collection is off unless
+    # enabled (TASKMASTER_METRICS=1, the dashboard's metrics switch, or the CLI's --metrics); a
+    # disabled timed() wrapper costs one attribute check per call.
+    enabled = os.environ.get("TASKMASTER_METRICS") == "1"
+    counters = {}
+    histograms = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def count(cls, name, amount=1):
+        if not cls.enabled: return
+        with cls.lock:
+            cls.counters[name] = cls.counters.get(name, 0) + amount
+
+    @classmethod
+    def observe(cls, name, seconds):
+        with cls.lock:
+            histogram = cls.histograms.get(name)
+            if histogram is None: histogram = cls.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    @classmethod
+    def timed(cls, name):
+        def decorate(function):
+            @wraps(function)
+            def timed_function(*args, **kwargs):
+                if not cls.enabled: return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    cls.observe(name, time.perf_counter() - start)
+            return timed_function
+        return decorate
+
+    @classmethod
+    def snapshot(cls):
+        with cls.lock:
+            timings = {name: {"count": histogram.count, "p50_ms": histogram.percentile(0.5) * 1e3,
+                              "p99_ms": histogram.percentile(0.99) * 1e3, "max_ms": histogram.max * 1e3,
+                              "mean_ms": histogram.total / histogram.count * 1e3, "buckets": dict(histogram.buckets)}
+                       for name, histogram in cls.histograms.items()}
+            return {"counters": dict(cls.counters), "timings": timings}
+
+    @classmethod
+    def export(cls, path):
+        snapshot = cls.snapshot()
+        snapshot["bucket_growth"] = Histogram.GROWTH
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(snapshot, file, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+        return path
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.counters.clear()
+            cls.histograms.clear()
+
+class PasswordHasher:
+    # KDFs are named "<name>:<cost params>" and stored per user next to the salt, so the default can be
+    # raised (or swapped) without invalidating existing accounts; they are rehashed on their next login.
+    default_kdf = "scrypt:16384:8:1"
+    workers = 2
+    executor = None
+    kdfs = {}
+
+    @classmethod
+    def register(cls, name, derive): cls.kdfs[name] = derive
+
+    @classmethod
+    def derive(cls, password, salt, kdf):
+        name, *params = kdf.split(":")
+        if name not in cls.kdfs: raise ValueError(f"Unknown password KDF: {name}")
+        return cls.kdfs[name](password.encode(), bytes.fromhex(salt), *map(int, params))
+
+    @classmethod
+    def hash(cls, password, kdf=None):
+        salt, kdf = os.urandom(16).hex(), kdf or cls.default_kdf
+        return salt, kdf, cls.derive(password, salt, kdf)
+
+    @classmethod
+    def verify(cls, password, salt, kdf, expected):
+        return hmac.compare_digest(cls.derive(password, salt, kdf), expected)
+
+    @classmethod
+    def needs_rehash(cls, kdf): return kdf != cls.default_kdf
+
+    @classmethod
+    def submit(cls, function, *args):
+        # Strong KDFs take tens of milliseconds by design; callers run them here, off the Tk thread.
+        if cls.executor is None:
+            cls.executor = ThreadPoolExecutor(cls.workers, thread_name_prefix="password-hasher")
+        return cls.executor.submit(function, *args)
+
+PasswordHasher.register("sha256", lambda password, salt: hashlib.sha256(password).hexdigest())
+PasswordHasher.register("pbkdf2_sha256", lambda password, salt, iterations: hashlib.pbkdf2_hmac("sha256", password, salt, iterations).hex())
+PasswordHasher.register("scrypt", lambda password, salt, n, r, p: hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32).hex())
+
+class DataStructure:
+    def __init__(self): self.items = []
+    def is_empty(self): return self.size() == 0
+    def size(self): return len(self.items)
+    def __iter__(self): return iter(self.items)
+
+class Node:
+    __slots__ = ("item", "prev", "next")
+
+    def __init__(self, item):
+        self.item = item
+        self.prev = self.next = None
+
+class Queue(DataStructure):
+    # Doubly linked list: enqueue, dequeue and unlinking the node handle returned by enqueue are all O(1).
+    def __init__(self):
+        self.head = self.tail = None
+        self.count = 0
+
+    def size(self): return self.count
+
+    def __iter__(self):
+        node = self.head
+        while node is not None:
+            yield node.item
+            node = node.next
+
+    def enqueue(self, item, before=None):
+        # Appends, or links the item in front of the node handle before.
+        node = Node(item)
+        if before is not None:
+            node.prev, node.next = before.prev, before
+            if before.prev is None: self.head = node
+            else: before.prev.next = node
+            before.prev = node
+        elif self.tail is None:
+            self.head = node
+            self.tail = node
+        else:
+            node.prev, self.tail.next = self.tail, node
+            self.tail = node
+        self.count += 1
+        return node
+
+    def dequeue(self):
+        if self.is_empty(): return None
+        node = self.head
+        self.unlink(node)
+        return node.item
+
+    def unlink(self, node):
+        if node.prev is None: self.head = node.next
+        else: node.prev.next = node.next
+        if node.next is None: self.tail = node.prev
+        else: node.next.prev = node.prev
+        node.prev = node.next = None
+        self.count -= 1
+
+class TaskQueue(Queue):
+    def __init__(self):
+        super().__init__()
+        self.index = {}
+
+    def enqueue(self, task, before=None):
+        node = super().enqueue(task, None if before is None else self.index[before.id])
+        self.index[task.id] = node
+        return node
+
+    def dequeue(self):
+        task = super().dequeue()
+        if task is not None: del self.index[task.id]
+        return task
+
+    def get(self, task_id):
+        node = self.index.get(task_id)
+        return node.item if node else None
+
+    def remove(self, task):
+        self.unlink(self.index.pop(task.id))
+
+    def successors(self, tasks):
+        # For each task, the id of the first task after it that is not itself in tasks (None at the
+        # end). Runs of adjacent tasks share one walk, so this is linear in len(tasks).
+        ids = {task.id for task in tasks}
+        found = {}
+        for task in tasks:
+            run, node = [], self.index[task.id]
+            while node is not None and node.item.id in ids and node.item.id not in found:
+                run.append(node.item.id)
+                node = node.next
+            after = None if node is None else found[node.item.id] if node.item.id in found else node.item.id
+            for task_id in run:
+                found[task_id] = after
+        return [found[task.id] for task in tasks]
+
+class PriorityQueue(DataStructure):
+    # Binary min-heap of [key, sequence, item] entries. positions maps each item to its slot,
+    # so arbitrary removal and re-keying are O(log n) like push and pop.
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+        self.positions = {}
+        self.sequence = 0
+
+    def __contains__(self, item): return item in self.positions
+    def __iter__(self): return (entry[2] for entry in self.items)
+
+    def push(self, item):
+        self.sequence += 1
+        self.items.append([self.key(item), self.sequence, item])
+        self.positions[item] = len(self.items) - 1
+        self.sift_up(len(self.items) - 1)
+
+    def peek(self): return self.items[0][2] if not self.is_empty() else None
+
+    def pop(self):
+        item = self.peek()
+        if item is not None: self.remove(item)
+        return item
+
+    def remove(self, item):
+        index = self.positions.pop(item)
+        last = self.items.pop()
+        if index < len(self.items):
+            self.items[index] = last
+            self.positions[last[2]] = index
+            self.sift_down(self.sift_up(index))
+
+    def update(self, item):
+        index = self.positions[item]
+        self.items[index][0] = self.key(item)
+        self.sift_down(self.sift_up(index))
+
+    def swap(self, i, j):
+        items = self.items
+        items[i], items[j] = items[j], items[i]
+        self.positions[items[i][2]] = i
+        self.positions[items[j][2]] = j
+
+    def sift_up(self, index):
+        while index > 0:
+            parent = (index - 1) // 2
+            if not self.items[index] < self.items[parent]: break
+            self.swap(index, parent)
+            index = parent
+        return index
+
+    def sift_down(self, index):
+        size = len(self.items)
+        while True:
+            smallest, left = index, 2 * index + 1
+            for child in (left, left + 1):
+                if child < size and self.items[child] < self.items[smallest]:
+                    smallest = child
+            if smallest == index: return index
+            self.swap(index, smallest)
+            index = smallest
+
+class Reminders:
+    # Due-date bookkeeping for open tasks: those whose due date has not passed wait in a heap keyed on
+    # it, the rest are in the overdue id set. Each change costs O(log n) and advance() only pops the
+    # tasks whose day has ended, so a front end needs just one timer, set for next_deadline().
+    def __init__(self):
+        self.upcoming = PriorityQueue(lambda task: task.due_ordinal)
+        self.overdue = set()
+
+    def track(self, task):
+        if task.completed or task.due_ordinal == Task.NO_DUE_DATE:
+            self.forget(task)
+        elif task.due_ordinal < date.today().toordinal():
+            if task in self.upcoming: self.upcoming.remove(task)
+            self.overdue.add(task.id)
+        elif task in self.upcoming:
+            self.upcoming.update(task)
+        else:
+            self.overdue.discard(task.id)
+            self.upcoming.push(task)
+
+    def forget(self, task):
+        if task in self.upcoming: self.upcoming.remove(task)
+        self.overdue.discard(task.id)
+
+    def advance(self):
+        # Moves every task whose due date is now in the past to the overdue set and returns them.
+        today = date.today().toordinal()
+        expired = []
+        while not self.upcoming.is_empty() and self.upcoming.peek().due_ordinal < today:
+            task = self.upcoming.pop()
+            self.overdue.add(task.id)
+            expired.append(task)
+        return expired
+
+    def next_deadline(self):
+        # The local midnight at which the earliest upcoming task becomes overdue, or None.
+        task = self.upcoming.peek()
+        return None if task is None else datetime.combine(date.fromordinal(task.due_ordinal + 1), datetime.min.time())
+
+class SearchIndex:
+    # Inverted index from lowercased words in titles and descriptions to tasks. The vocabulary is kept
+    # sorted, so every word starting with a prefix is one contiguous run found by bisect. Postings hold
+    # each task's insertion sequence number rather than its id, so results sort as plain ints.
+    TOKEN = re.compile(r"\w+")
+
+    def __init__(self):
+        self.postings = {}
+        self.words = []
+        self.documents = {}
+        self.ids = {}
+        self.sequence = 0
+
+    @classmethod
+    def tokenize(cls, text): return cls.TOKEN.findall(text.lower())
+
+    def add(self, task, order=None):
+        words = frozenset(self.tokenize(task.title + " " + task.description))
+        if order is None:
+            self.sequence += 1
+            order = self.sequence
+        self.documents[task.id] = (order, words)
+        self.ids[order] = task.id
+        for word in words:
+            if word not in self.postings:
+                self.postings[word] = set()
+                insort(self.words, word)
+            self.postings[word].add(order)
+
+    def remove(self, task):
+        order, words = self.documents.pop(task.id, (None, ()))
+        self.ids.pop(order, None)
+        for word in words:
+            orders = self.postings[word]
+            orders.discard(order)
+            if not orders:
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+        return order
+
+    def update(self, task):
+        order = self.remove(task)
+        self.add(task, order)
+
+    def prefix_matches(self, prefix):
+        start = bisect_left(self.words, prefix)
+        end = start
+        while end < len(self.words) and self.words[end].startswith(prefix):
+            end += 1
+        return set().union(*(self.postings[word] for word in self.words[start:end]))
+
+    def search(self, query):
+        # Every term is matched as a prefix (the user may still be typing it). The longest term
+        # seeds the candidates; once those are few, the remaining terms are checked per document.
+        terms = sorted(set(self.tokenize(query)), key=len, reverse=True)
+        if not terms: return []
+        matches = self.prefix_matches(terms[0])
+        for term in terms[1:]:
+            if len(matches) < 1000:
+                matches = {order for order in matches
+                           if any(word.startswith(term) for word in self.documents[self.ids[order]][1])}
+            else:
+                matches &= self.prefix_matches(term)
+        return [self.ids[order] for order in sorted(matches)]
+
+class FacetIndex:
+    # Secondary indexes for the filter bar and the sortable columns. Tasks are numbered in insertion
+    # order; each facet maps a value to the set of those numbers, so filters are set intersections, and
+    # each column keeps its (key, number) pairs sorted, so a sort is a read. Small changes insort and
+    # bisect; batches of BULK or more append (the column is sorted once, the next time it is read) and
+    # drop entries in a single filtering pass.
+    BULK = 32
+    FACETS = ("category", "priority", "completed")
+    SORT_KEYS = {
+        "Title": lambda task: task.title.lower(),
+        "Priority": lambda task: Task.PRIORITY_RANK.get(task.priority, len(Task.PRIORITY_RANK)),
+        "Due Date": lambda task: task.due_ordinal,
+        "Category": lambda task: task.category,
+        "Status": lambda task: task.completed,
+    }
+
+    def __init__(self):
+        self.facets = {facet: {} for facet in self.FACETS}
+        self.columns = {column: [] for column in self.SORT_KEYS}
+        self.keys = {column: [] for column in self.SORT_KEYS}
+        self.unsorted = set()
+        self.ids = []
+        self.values = []
+        self.orders = {}
+        self.released = {}
+
+    def __len__(self): return len(self.orders)
+
+    def add(self, task, order=None):
+        # A task that is removed and added back (undo of a delete) gets its old number, and so its old place.
+        if order is None: order = self.released.pop(task.id, None)
+        if order is None:
+            order = len(self.ids)
+            self.ids.append(None)
+            self.values.append(None)
+            for keys in self.keys.values():
+                keys.append(None)
+        self.orders[task.id] = order
+        self.ids[order] = task.id
+        self.values[order] = values = tuple(getattr(task, facet) for facet in self.FACETS)
+        for facet, value in zip(self.FACETS, values):
+            self.facets[facet].setdefault(value, set()).add(order)
+        for column, key in self.SORT_KEYS.items():
+            key = self.keys[column][order] = key(task)
+            if column in self.unsorted: self.columns[column].append((key, order))
+            else: insort(self.columns[column], (key, order))
+
+    def add_many(self, tasks, orders=None):
+        if len(tasks) >= self.BULK: self.unsorted.update(self.SORT_KEYS)
+        for task, order in zip(tasks, orders or [None] * len(tasks)):
+            self.add(task, order)
+
+    def unindex(self, orders):
+        for order in orders:
+            for facet, value in zip(self.FACETS, self.values[order]):
+                self.facets[facet][value].discard(order)
+        for column, keys in self.keys.items():
+            if len(orders) < self.BULK:
+                entries = self.column(column)
+                for order in orders:
+                    del entries[bisect_left(entries, (keys[order], order))]
+            else:
+                dropped = set(orders)
+                self.columns[column] = [entry for entry in self.columns[column] if entry[1] not in dropped]
+
+    def remove(self, task): self.remove_many([task])
+    def update(self, task): self.update_many([task])
+
+    def remove_many(self, tasks):
+        orders = [self.orders.pop(task.id) for task in tasks]
+        self.unindex(orders)
+        for task, order in zip(tasks, orders):
+            self.released[task.id] = order
+            self.ids[order] = self.values[order] = None
+            for keys in self.keys.values():
+                keys[order] = None
+
+    def update_many(self, tasks):
+        # Re-keys in place: tasks keep their numbers, so insertion order is unchanged. Only the facets
+        # and columns whose value changed are touched; completing a task moves one facet and one column.
+        orders = [self.orders[task.id] for task in tasks]
+        for task, order in zip(tasks, orders):
+            values = tuple(getattr(task, facet) for facet in self.FACETS)
+            for facet, old, new in zip(self.FACETS, self.values[order], values):
+                if old != new:
+                    self.facets[facet][old].discard(order)
+                    self.facets[facet].setdefault(new, set()).add(order)
+            self.values[order] = values
+        for column, key in self.SORT_KEYS.items():
+            keys = self.keys[column]
+            changes = [(order, new) for order, new in zip(orders, map(key, tasks)) if new != keys[order]]
+            if changes: self.rekey(column, changes)
+
+    def rekey(self, column, changes):
+        keys = self.keys[column]
+        if len(changes) < self.BULK:
+            entries = self.column(column)
+            for order, key in changes:
+                del entries[bisect_left(entries, (keys[order], order))]
+                keys[order] = key
+                insort(entries, (key, order))
+        else:
+            dropped = {order for order, key in changes}
+            entries = self.columns[column] = [entry for entry in self.columns[column] if entry[1] not in dropped]
+            for order, key in changes:
+                keys[order] = key
+                entries.append((key, order))
+            self.unsorted.add(column)
+
+    def column(self, column):
+        if column in self.unsorted:
+            self.columns[column].sort()
+            self.unsorted.discard(column)
+        return self.columns[column]
+
+    def filter(self, category=None, priority=None, completed=None, overdue=False, task_ids=None):
+        # Returns the matching task numbers for ordered(), or None when nothing is filtered.
+        if overdue: completed = False
+        sets = [self.facets[facet].get(value, set()) for facet, value in
+                (("category", category), ("priority", priority), ("completed", completed)) if value is not None]
+        if task_ids is not None:
+            sets.append({self.orders[task_id] for task_id in task_ids})
+        if not sets: return None
+        sets.sort(key=len)
+        if overdue:
+            # Overdue is the prefix of the due-date column before today, found by bisection. When it is
+            # shorter than every facet set, the prefix is walked against the smallest one and the rest
+            # are intersected with that; otherwise the facets are intersected and the due dates checked.
+            today = date.today().toordinal()
+            entries = self.column("Due Date")
+            end = bisect_left(entries, (today, -1))
+            if end < len(sets[0]):
+                smallest = sets[0]
+                return {order for key, order in entries[:end] if order in smallest}.intersection(*sets[1:])
+        orders = sets[0].intersection(*sets[1:])
+        if overdue:
+            due = self.keys["Due Date"]
+            orders = {order for order in orders if due[order] < today}
+        return orders
+
+    def ordered(self, column=None, descending=False, orders=None):
+        # A small filtered view sorts just its own numbers; otherwise the maintained column is walked.
+        if orders is not None and (column is None or len(orders) * 4 < len(self.orders)):
+            selected = sorted(orders)
+            if column is not None: selected.sort(key=self.keys[column].__getitem__)
+        elif column is None:
+            selected = [order for order, task_id in enumerate(self.ids) if task_id is not None]
+        else:
+            selected = [order for key, order in self.column(column)]
+            if orders is not None: selected = [order for order in selected if order in orders]
+        if descending: selected.reverse()
+        return [self.ids[order] for order in selected]
+
+class Stack(DataStructure):
+    # With a limit, pushing onto a full stack drops the item at the bottom.
+    def __init__(self, limit=None): self.items = deque(maxlen=limit)
+    def push(self, item): self.items.append(item)
+    def pop(self): return self.items.pop() if not self.is_empty() else None
+    def clear(self): self.items.clear()
+
+class Task:
+    # Slotted so large task sets carry no per-instance __dict__; priority and category strings are
+    # interned and the due date is parsed once, when it is assigned. version is the stored row's
+    # version, which writes check against (see TaskRepository.apply); seq, when known, is the row's
+    # place in insertion order, kept so a deleted task restored by undo is stored back in its place.
+    __slots__ = ("id", "title", "description", "priority", "category", "completed", "_due_date", "due_ordinal",
+                 "version", "seq")
+    PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+    FIELDS = ("id", "title", "description", "due_date", "priority", "category", "completed")
+    NO_DUE_DATE = date.max.toordinal()
+
+    def __init__(self, title, description, due_date, priority, category, task_id=None):
+        self.id = task_id or uuid.uuid4().hex
+        self.title = title
+        self.description = description
+        self.due_date = due_date
+        self.priority = sys.intern(priority)
+        self.category = sys.intern(category)
+        self.completed = False
+        self.version = 0
+        self.seq = None
+
+    @property
+    def due_date(self): return self._due_date
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due_date = value
+        self.due_ordinal = self.parse_due_date(value)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def parse_due_date(value):
+        try:
+            return date.fromisoformat(value).toordinal()
+        except (TypeError, ValueError):
+            return Task.NO_DUE_DATE
+
+    def schedule_key(self):
+        return (self.PRIORITY_RANK.get(self.priority, len(self.PRIORITY_RANK)), self.due_ordinal)
+
+    def to_row(self):
+        return (self.id, self.title, self.description, self._due_date, self.priority, self.category, self.completed)
+
+    @classmethod
+    def from_row(cls, row):
+        # A row saved by DeleteTasks carries the stored seq after the fields.
+        task = cls(row[1], row[2], row[3], row[4], row[5], row[0])
+        task.completed = bool(row[6])
+        if len(row) > len(cls.FIELDS): task.seq = row[len(cls.FIELDS)]
+        return task
+
+    def to_dict(self):
+        return dict(zip(self.FIELDS, self.to_row()))
+
+    @classmethod
+    def from_dict(cls, task_dict):
+        # Imported files are external input: missing or null fields take their defaults.
+        task = cls(
+            str(task_dict.get("title") or ""),
+            str(task_dict.get("description") or ""),
+            str(task_dict.get("due_date") or ""),
+            str(task_dict.get("priority") or "Low"),
+            str(task_dict.get("category") or "Other"),
+            task_dict.get("id") and str(task_dict["id"])
+        )
+        task.completed = bool(task_dict.get("completed", False))
+        return task
+
+class TaskTable:
+    # Columnar form of a task set: strings stay in lists, priority and category become two-byte codes
+    # into a shared name table (categories are free-form, so there can be more than 256 names), due
+    # dates are ordinals and completion is a bitmap. Task objects are only materialized on demand
+    # through task(). Loads and imports don't go through it: the dashboard keeps every task as a Task,
+    # so pages and import batches are built as Tasks directly.
+    def __init__(self):
+        self.ids, self.titles, self.descriptions, self.due_dates = [], [], [], []
+        self.due_ordinals = array("i")
+        self.versions = array("i")
+        self.priorities = array("H")
+        self.categories = array("H")
+        self.completed = bytearray()
+        self.names, self.codes = [], {}
+        self.count = 0
+
+    def __len__(self): return self.count
+
+    def code(self, name):
+        if name not in self.codes:
+            self.codes[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return self.codes[name]
+
+    def append_row(self, row, version=0):
+        index = self.count
+        self.ids.append(row[0])
+        self.titles.append(row[1])
+        self.descriptions.append(row[2])
+        self.due_dates.append(row[3])
+        self.due_ordinals.append(Task.parse_due_date(row[3]))
+        self.priorities.append(self.code(row[4]))
+        self.categories.append(self.code(row[5]))
+        if index & 7 == 0: self.completed.append(0)
+        if row[6]: self.completed[index >> 3] |= 1 << (index & 7)
+        self.versions.append(version)
+        self.count += 1
+
+    def append(self, task): self.append_row(task.to_row(), task.version)
+
+    def is_completed(self, index): return bool(self.completed[index >> 3] >> (index & 7) & 1)
+
+    def row(self, index):
+        return (self.ids[index], self.titles[index], self.descriptions[index], self.due_dates[index],
+                self.names[self.priorities[index]], self.names[self.categories[index]], self.is_completed(index))
+
+    def rows(self): return (self.row(index) for index in range(self.count))
+    def task(self, index):
+        task = Task.from_row(self.row(index))
+        task.version = self.versions[index]
+        return task
+    def tasks(self): return (self.task(index) for index in range(self.count))
+
+class TaskCommand:
+    # One undoable change, recorded as task ids and field values rather than live Task objects so a
+    # history entry stays small and can be saved. apply() redoes it and revert() undoes it, each as a
+    # single incremental change on the target (the dashboard).
+    __slots__ = ()
+    KINDS = {}
+
+    @staticmethod
+    def task(target, task_id):
+        task = target.tasks.get(task_id)
+        if task is None: raise LookupError("The task this action changed no longer exists")
+        return task
+
+    @classmethod
+    def from_record(cls, record): return cls.KINDS[record[0]](*record[1:])
+
+class AddTasks(TaskCommand):
+    # befores holds, per row, the id of the task that followed it, so restored tasks go back to their old place.
+    __slots__ = ("rows", "befores")
+
+    def __init__(self, rows, befores=None):
+        self.rows = tuple(map(tuple, rows))
+        self.befores = tuple(befores) if befores else (None,) * len(self.rows)
+
+    def insert(self, target):
+        if any(target.tasks.get(row[0]) is not None for row in self.rows):
+            raise LookupError("A task this action restores already exists")
+        target.restore_tasks([Task.from_row(row) for row in self.rows],
+                             [target.tasks.get(before) if before else None for before in self.befores])
+
+    def delete(self, target): target.remove_tasks([self.task(target, row[0]) for row in self.rows])
+
+    apply, revert = insert, delete
+    def to_record(self): return ["add", [list(row) for row in self.rows], list(self.befores)]
+
+class DeleteTasks(AddTasks):
+    __slots__ = ()
+    apply, revert = AddTasks.delete, AddTasks.insert
+    def to_record(self): return ["delete", [list(row) for row in self.rows], list(self.befores)]
+
+class EditTasks(TaskCommand):
+    # Field-level diffs: per task, only the (field, old, new) triples that actually changed.
+    __slots__ = ("edits",)
+
+    def __init__(self, edits):
+        self.edits = tuple((task_id, tuple(map(tuple, changes))) for task_id, changes in edits)
+
+    @classmethod
+    def diff(cls, tasks, **values):
+        edits = []
+        for task in tasks:
+            changes = [(field, getattr(task, field), value) for field, value in values.items() if getattr(task, field) != value]
+            if changes: edits.append((task.id, changes))
+        return cls(edits) if edits else None
+
+    def apply(self, target): self.set(target, 2)
+    def revert(self, target): self.set(target, 1)
+
+    def set(self, target, side):
+        tasks = [self.task(target, task_id) for task_id, changes in self.edits]
+        for task, (task_id, changes) in zip(tasks, self.edits):
+            for change in changes:
+                setattr(task, change[0], change[side])
+        target.update_tasks(tasks)
+
+    def to_record(self): return ["edit", [[task_id, [list(change) for change in changes]] for task_id, changes in self.edits]]
+
+TaskCommand.KINDS.update(add=AddTasks, delete=DeleteTasks, edit=EditTasks)
+
+class History:
+    # Bounded undo/redo over TaskCommands. Both sides are capped Stacks, so record, undo and redo are
+    # O(1) and the oldest entries are evicted once limit is reached.
+    def __init__(self, limit=200):
+        self.limit = limit
+        self.undo_stack = Stack(limit)
+        self.redo_stack = Stack(limit)
+
+    def record(self, command):
+        self.undo_stack.push(command)
+        self.redo_stack.clear()
+
+    def undo(self, target): return self.step(self.undo_stack, self.redo_stack, "revert", target)
+    def redo(self, target): return self.step(self.redo_stack, self.undo_stack, "apply", target)
+
+    def step(self, source, destination, action, target):
+        # A command whose task is gone raises LookupError and is dropped rather than retried.
+        command = source.pop()
+        if command is None: return None
+        getattr(command, action)(target)
+        destination.push(command)
+        return command
+
+    def dump(self):
+        records = {"undo": [command.to_record() for command in self.undo_stack],
+                   "redo": [command.to_record() for command in self.redo_stack]}
+        return zlib.compress(json.dumps(records, separators=(",", ":")).encode())
+
+    @classmethod
+    def load(cls, data, limit=200):
+        history = cls(limit)
+        if data:
+            records = json.loads(zlib.decompress(data))
+            for name in ("undo", "redo"):
+                for record in records[name]:
+                    getattr(history, name + "_stack").push(TaskCommand.from_record(record))
+        return history
+
+class DatabaseManager:
+    SCHEMA = ('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY, username TEXT UNIQUE NOT NULL, password TEXT NOT NULL)''',)
+    # Accounts created before salted KDFs keep an empty salt and the legacy unsalted "sha256".
+    KDF_COLUMNS = ("ALTER TABLE users ADD COLUMN salt TEXT NOT NULL DEFAULT ''",
+                   "ALTER TABLE users ADD COLUMN kdf TEXT NOT NULL DEFAULT 'sha256'")
+    # Statements are kept as constants so each pooled connection's statement cache reuses them.
+    ADD_USER = "INSERT INTO users (username, password, salt, kdf) VALUES (?, ?, ?, ?)"
+    FIND_USER = "SELECT id, password, salt, kdf FROM users WHERE username=?"
+    USER_EXISTS = "SELECT 1 FROM users WHERE username=?"
+    REHASH_USER = "UPDATE users SET password=?, salt=?, kdf=? WHERE id=?"
+
+    def __init__(self, db_name='users.db'):
+        self.db_name = db_name
+        self.pool = None
+        self.conn = None
+        self.cursor = None
+
+    def __enter__(self):
+        self.pool = ConnectionPool.get(self.db_name)
+        self.conn = self.pool.acquire()
+        self.cursor = self.conn.cursor()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.conn:
+            self.pool.release(self.conn)
+            self.conn = self.cursor = None
+
+    def has_user(self, username):
+        # A lookup without hashing, so callers can skip the KDF cost of an add_user that would fail anyway.
+        return self.cursor.execute(self.USER_EXISTS, (username,)).fetchone() is not None
+
+    @Metrics.timed("db.add_user")
+    def add_user(self, username, password):
+        salt, kdf, digest = PasswordHasher.hash(password)
+        try:
+            self.cursor.execute(self.ADD_USER, (username, digest, salt, kdf))
+            self.conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    @Metrics.timed("db.validate_user")
+    def validate_user(self, username, password):
+        self.cursor.execute(self.FIND_USER, (username,))
+        row = self.cursor.fetchone()
+        if row is None:
+            # Spend the same work on unknown usernames so response time doesn't reveal which exist.
+            PasswordHasher.hash(password)
+            return None
+
+        user_id, digest, salt, kdf = row
+        if not PasswordHasher.verify(password, salt, kdf, digest):
+            return None
+        if PasswordHasher.needs_rehash(kdf):
+            salt, kdf, digest = PasswordHasher.hash(password)
+            self.cursor.execute(self.REHASH_USER, (digest, salt, kdf, user_id))
+            self.conn.commit()
+        return user_id
+
+class TaskRepository:
+    PRIORITY_RANK = "CASE priority WHEN 'High' THEN 0 WHEN 'Medium' THEN 1 WHEN 'Low' THEN 2 ELSE 3 END"
+    DUE_DATE_PATTERN = "due_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    # SQL forms of FacetIndex.SORT_KEYS; tasks without a due date sort after every dated one.
+    SORT_COLUMNS = {"Title": ("lower(title)",), "Priority": (PRIORITY_RANK,),
+                    "Due Date": (f"NOT ({DUE_DATE_PATTERN})", "due_date"), "Category": ("category",), "Status": ("completed",)}
+    FIELDS = Task.FIELDS
+    INSERT_TASK = f"INSERT INTO tasks (owner, {', '.join(FIELDS)}, version, seq) VALUES ({', '.join('?' * (len(FIELDS) + 3))})"
+    LOAD_TASK = INSERT_TASK.replace("INSERT", "INSERT OR REPLACE", 1)
+    UPDATE_TASK = (f"UPDATE tasks SET {', '.join(field + '=?' for field in FIELDS[1:])}, version=version+1 "
+                   "WHERE owner=? AND id=? AND version=?")
+    DELETE_TASK = "DELETE FROM tasks WHERE owner=? AND id=? AND version=?"
+    TASK_EXISTS = "SELECT 1 FROM tasks WHERE owner=? AND id=?"
+    SEQ_TAKEN = "SELECT 1 FROM tasks WHERE seq=?"
+    LOG_CHANGE = "INSERT INTO task_changes (owner, id, origin) VALUES (?, ?, ?)"
+    PRUNE_CHANGES = "DELETE FROM task_changes WHERE rev <= (SELECT MAX(rev) FROM task_changes) - ?"
+    CHANGE_LOG_LIMIT = 10000
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS tasks (
+            seq INTEGER PRIMARY KEY, id TEXT NOT NULL, owner INTEGER NOT NULL,
+            title TEXT NOT NULL, description TEXT NOT NULL, due_date TEXT NOT NULL,
+            priority TEXT NOT NULL, category TEXT NOT NULL, completed INTEGER NOT NULL,
+            UNIQUE (owner, id))''',
+        f"CREATE INDEX IF NOT EXISTS tasks_status ON tasks (owner, completed, {PRIORITY_RANK}, due_date)",
+        "CREATE INDEX IF NOT EXISTS tasks_category ON tasks (owner, category)",
+        # Indexes carry the rowid, so this one also serves per-owner seq ranges for paging.
+        "CREATE INDEX IF NOT EXISTS tasks_owner ON tasks (owner)",
+    )
+    HISTORY_SCHEMA = ("CREATE TABLE IF NOT EXISTS history (owner INTEGER PRIMARY KEY, entries BLOB NOT NULL)",)
+    # Every committed task change is logged with the writer it came from, so other processes sharing
+    # the file can read just what changed since they last looked. Only the newest CHANGE_LOG_LIMIT
+    # entries are kept.
+    CHANGE_LOG_SCHEMA = (
+        "ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+        '''CREATE TABLE IF NOT EXISTS task_changes (
+            rev INTEGER PRIMARY KEY AUTOINCREMENT, owner INTEGER NOT NULL, id TEXT NOT NULL, origin TEXT NOT NULL)''',
+        "CREATE INDEX IF NOT EXISTS task_changes_owner ON task_changes (owner)",
+    )
+
+    def __init__(self, db_name='users.db', owner=0, origin="", dedicated=False):
+        # dedicated repositories live as long as their TaskService and hold a connection of their own.
+        self.db_name = db_name
+        self.owner = owner
+        self.origin = origin
+        self.pool = ConnectionPool.get(db_name)
+        self.dedicated = dedicated
+        self.conn = self.pool.connect() if dedicated else self.pool.acquire()
+        self.cursor = self.conn.cursor()
+
+    def close(self):
+        if self.conn:
+            if self.dedicated: self.conn.close()
+            else: self.pool.release(self.conn)
+            self.conn = None
+
+    def add(self, task): self.add_many([task])
+
+    @Metrics.timed("store.write")
+    def add_many(self, tasks):
+        # Bulk loads of new tasks (imports): each gets the next seq, and a repeated id keeps the last copy.
+        rows = [task.to_row() + (task.version, None) for task in tasks]
+        with self.conn:
+            self.cursor.executemany(self.LOAD_TASK, ((self.owner,) + row for row in rows))
+            self.log_changes(row[0] for row in rows)
+
+    def update(self, task):
+        if not self.apply([("update", task.to_row(), task.version, task.seq)]): task.version += 1
+
+    def delete(self, task): self.apply([("delete", task.to_row(), task.version, task.seq)])
+
+    @Metrics.timed("store.write")
+    def apply(self, operations, seqs=None):
+        # Runs a batch of ("add" | "update" | "delete", Task.to_row(), version, seq) operations as one
+        # transaction. Updates and deletes only match the row at the version they were read at; when
+        # another writer got there first the operation is skipped and the task id returned. An add
+        # conflicts the same way when the task is already stored, e.g. an undone delete that itself
+        # lost to another writer. It reuses its seq unless a newer task has taken it, so restored
+        # tasks keep their place; the seq each add was stored at goes into seqs, by task id.
+        changed, conflicts = [], []
+        with self.conn:
+            for op, row, version, seq in operations:
+                if op == "add":
+                    if self.conn.execute(self.TASK_EXISTS, (self.owner, row[0])).fetchone():
+                        conflicts.append(row[0])
+                        continue
+                    if seq is not None and self.conn.execute(self.SEQ_TAKEN, (seq,)).fetchone(): seq = None
+                    self.cursor.execute(self.INSERT_TASK, (self.owner,) + row + (version, seq))
+                    if seqs is not None: seqs[row[0]] = self.cursor.lastrowid
+                elif op == "update":
+                    self.cursor.execute(self.UPDATE_TASK, row[1:] + (self.owner, row[0], version))
+                elif op == "delete":
+                    self.cursor.execute(self.DELETE_TASK, (self.owner, row[0], version))
+                if self.cursor.rowcount:
+                    changed.append(row[0])
+                elif op == "update" or self.conn.execute(self.TASK_EXISTS, (self.owner, row[0])).fetchone():
+                    conflicts.append(row[0])
+            self.log_changes(changed)
+        return conflicts
+
+    def log_changes(self, task_ids):
+        self.cursor.executemany(self.LOG_CHANGE, ((self.owner, task_id, self.origin) for task_id in task_ids))
+        self.cursor.execute(self.PRUNE_CHANGES, (self.CHANGE_LOG_LIMIT,))
+
+    def data_version(self):
+        # Moves on whenever another connection commits to the file, so polling it is a cheap "anything new?".
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+    def stored_ids(self, task_ids):
+        # The subset of task_ids stored for this owner, read in chunks to stay under SQLite's bound-parameter limit.
+        stored = set()
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            stored.update(task_id for task_id, in self.conn.execute(
+                f"SELECT id FROM tasks WHERE owner=? AND id IN ({', '.join('?' * len(chunk))})", [self.owner] + chunk))
+        return stored
+
+    def revision(self):
+        return self.conn.execute("SELECT MAX(rev) FROM task_changes").fetchone()[0] or 0
+
+    @Metrics.timed("store.changes")
+    def changes(self, since):
+        # Returns (revision, tasks, complete): the stored (row, version, seq) of every task other writers
+        # changed after revision since, or None for one since deleted. When the log has been pruned
+        # past since, tasks holds every stored task instead and complete is True.
+        self.conn.execute("BEGIN")
+        try:
+            latest, oldest = self.conn.execute("SELECT MAX(rev), MIN(rev) FROM task_changes").fetchone()
+            if latest is None or latest <= since: return since, {}, False
+            if oldest > since + 1:
+                rows = self.conn.execute(f"SELECT version, seq, {', '.join(self.FIELDS)} FROM tasks WHERE owner=?", (self.owner,))
+                return latest, {row[2]: (row[2:], row[0], row[1]) for row in rows}, True
+            rows = self.conn.execute(f"SELECT c.id, t.version, t.seq, {', '.join('t.' + field for field in self.FIELDS[1:])} "
+                                     "FROM (SELECT DISTINCT id FROM task_changes WHERE owner=? AND rev>? AND rev<=? AND origin<>?) c "
+                                     "LEFT JOIN tasks t ON t.owner=? AND t.id=c.id",
+                                     (self.owner, since, latest, self.origin, self.owner))
+            return latest, {row[0]: None if row[1] is None else ((row[0],) + row[3:], row[1], row[2]) for row in rows}, False
+        finally:
+            self.conn.rollback()
+
+    def load_history(self):
+        row = self.conn.execute("SELECT entries FROM history WHERE owner=?", (self.owner,)).fetchone()
+        return row[0] if row else None
+
+    def save_history(self, entries):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO history (owner, entries) VALUES (?, ?)", (self.owner, entries))
+
+    @staticmethod
+    def stored_task(row):
+        # A (fields..., seq, version) row as selected from tasks; Task.from_row reads the seq after the fields.
+        task = Task.from_row(row)
+        task.version = row[-1]
+        return task
+
+    @Metrics.timed("store.query")
+    def query(self, category=None, priority=None, status=None, sort=None, descending=False, limit=None):
+        # TaskService.query without the text search, as one SQL query on the tasks_status and
+        # tasks_category indexes, for callers that don't load every task (the command-line list).
+        clauses, params = ["owner=?"], [self.owner]
+        if status is not None:
+            clauses.append("completed=?")
+            params.append(int(status == "completed"))
+        if status == "overdue":
+            clauses.append(f"{self.DUE_DATE_PATTERN} AND due_date<?")
+            params.append(date.today().isoformat())
+        if priority in Task.PRIORITY_RANK:
+            clauses.append(f"{self.PRIORITY_RANK}=?")
+            params.append(Task.PRIORITY_RANK[priority])
+        elif priority is not None:
+            clauses.append("priority=?")
+            params.append(priority)
+        if category is not None:
+            clauses.append("category=?")
+            params.append(category)
+        direction = " DESC" if descending else ""
+        order = ", ".join(key + direction for key in self.SORT_COLUMNS.get(sort, ()) + ("seq",))
+        rows = self.conn.execute(f"SELECT {', '.join(self.FIELDS)}, seq, version FROM tasks WHERE {' AND '.join(clauses)} "
+                                 f"ORDER BY {order} LIMIT ?", params + [-1 if limit is None else limit])
+        return [self.stored_task(row) for row in rows]
+
+    def pages(self, page_size):
+        # Keyset pagination over insertion order, bounded by the newest row at the time of the
+        # first call so tasks added while paging are not yielded twice. Each page is a list of Tasks.
+        self.cursor.execute("SELECT MAX(seq) FROM tasks WHERE owner=?", (self.owner,))
+        last, newest = 0, self.cursor.fetchone()[0] or 0
+        while last < newest:
+            rows = self.conn.execute(f"SELECT {', '.join(self.FIELDS)}, seq, version FROM tasks WHERE owner=? AND seq>? AND seq<=? ORDER BY seq LIMIT ?",
+                                     (self.owner, last, newest, page_size)).fetchall()
+            if not rows: break
+            last = rows[-1][-2]
+            yield [self.stored_task(row) for row in rows]
+
+    def import_json(self, file_path):
+        # One-time migration of a tasks.json snapshot and its journal; the files are renamed
+        # afterwards so the import never runs twice.
+        if not os.path.exists(file_path): return 0
+        journal = TaskJournal(file_path)
+        paths = (file_path, journal.journal_path, journal.rotated_path)
+        if any(os.path.exists(path) for path in paths[1:]):
+            records = journal.load()
+            self.add_many(Task.from_dict(record) for record in records)
+            imported = len(records)
+        else:
+            # A plain snapshot is streamed in batches, so peak memory stays at one batch.
+            imported = 0
+            for tasks in TaskFiles.batches(TaskFiles.read(file_path), TaskFiles.BATCH_SIZE):
+                self.add_many(tasks)
+                imported += len(tasks)
+        for path in paths:
+            if os.path.exists(path): os.replace(path, path + ".imported")
+        return imported
+
+class TaskFiles:
+    # Streaming readers and writers for task files. Readers are generators of task dicts, so a file
+    # of any size flows through batches() without ever being held in memory at once.
+    BATCH_SIZE = 1000
+    CHUNK_SIZE = 1 << 16
+    FORMATS = (("JSON Lines", "*.jsonl"), ("JSON", "*.json"), ("CSV", "*.csv"))
+
+    @staticmethod
+    def read(path):
+        return TaskFiles.read_jsonl(path) if path.endswith(".jsonl") else TaskFiles.read_json(path)
+
+    @staticmethod
+    def read_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip(): yield json.loads(line)
+
+    @staticmethod
+    def read_json(path):
+        # Incremental parse of a top-level JSON array of tasks, or of the "tasks" array of a top-level
+        # object such as a TaskJournal snapshot (its other keys are skipped): values are decoded one by
+        # one with raw_decode as chunks arrive.
+        decoder = json.JSONDecoder()
+        with open(path, 'r', encoding='utf-8') as file:
+            state = {"buffer": "", "position": 0}
+
+            def more():
+                chunk = file.read(TaskFiles.CHUNK_SIZE)
+                state["buffer"], state["position"] = state["buffer"][state["position"]:] + chunk, 0
+                return bool(chunk)
+
+            def peek():
+                # The next character that is not whitespace or a comma, or "" at the end of the file.
+                while True:
+                    buffer, position = state["buffer"], state["position"]
+                    while position < len(buffer) and buffer[position] in " \t\r\n,":
+                        position += 1
+                    state["position"] = position
+                    if position < len(buffer): return buffer[position]
+                    if not more(): return ""
+
+            def take(char):
+                if peek() != char: raise ValueError(f"{path}: expected {char!r} at a task list")
+                state["position"] += 1
+
+            def value():
+                # A value ending exactly at the end of the buffer (a number, say) may continue in the next chunk.
+                peek()
+                while True:
+                    try:
+                        result, end = decoder.raw_decode(state["buffer"], state["position"])
+                    except json.JSONDecodeError:
+                        if not more(): raise
+                        continue
+                    if end < len(state["buffer"]) or not more():
+                        state["position"] = end
+                        return result
+
+            first = peek()
+            if first == "{":
+                take("{")
+                while peek() not in ("}", ""):
+                    key = value()
+                    take(":")
+                    if key == "tasks": break
+                    value()
+                else:
+                    return
+            elif first == "":
+                return
+            take("[")
+            while peek() != "]":
+                if peek() == "": raise ValueError(f"{path}: the task list is not closed")
+                yield value()
+
+    @staticmethod
+    def batches(task_dicts, size):
+        tasks = []
+        for task_dict in task_dicts:
+            if not isinstance(task_dict, dict): raise ValueError(f"Not a task: {task_dict!r:.80}")
+            tasks.append(Task.from_dict(task_dict))
+            if len(tasks) == size:
+                yield tasks
+                tasks = []
+        if tasks: yield tasks
+
+    @staticmethod
+    def write(path, rows):
+        # rows are Task.to_row() tuples; the format follows the extension. The file is written beside
+        # the target and renamed over it, so a failed export never leaves half a file behind.
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8', newline='') as file:
+            if path.endswith(".csv"):
+                writer = csv.writer(file)
+                writer.writerow(Task.FIELDS)
+                writer.writerows(rows)
+            elif path.endswith(".jsonl"):
+                for row in rows:
+                    file.write(json.dumps(dict(zip(Task.FIELDS, row))) + "\n")
+            else:
+                file.write("[")
+                for index, row in enumerate(rows):
+                    file.write(("\n" if index == 0 else ",\n") + json.dumps(dict(zip(Task.FIELDS, row))))
+                file.write("\n]\n")
+        os.replace(temp_path, path)
+
+class ConnectionPool:
+    # One pool per database file, shared by every DatabaseManager and TaskRepository in the process.
+    # Connections are opened lazily up to size, kept open, and handed to one thread at a time. Holders
+    # that keep a connection for their whole life (a TaskService's store and writer) open their own
+    # with connect() instead, so any number of them never starve logins and exports of pooled ones.
+    MIGRATIONS = (DatabaseManager.SCHEMA, TaskRepository.SCHEMA, DatabaseManager.KDF_COLUMNS, TaskRepository.HISTORY_SCHEMA,
+                  TaskRepository.CHANGE_LOG_SCHEMA)
+    PRAGMAS = ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA busy_timeout=5000",
+               "PRAGMA cache_size=-8000", "PRAGMA temp_store=MEMORY")
+    STATEMENT_CACHE = 256
+    pools = {}
+    pools_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db_name, size=4):
+        with cls.pools_lock:
+            if db_name not in cls.pools:
+                cls.pools[db_name] = cls(db_name, size)
+            return cls.pools[db_name]
+
+    def __init__(self, db_name, size=4):
+        self.db_name = db_name
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        conn = self.connect()
+        self.opened += 1
+        self.migrate(conn)
+        self.release(conn)
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, cached_statements=self.STATEMENT_CACHE)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def migrate(self, conn):
+        # user_version records how many MIGRATIONS steps this database file has already applied. The
+        # write lock is taken first so two processes opening a fresh file don't both run a step.
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for statements in self.MIGRATIONS[version:]:
+            for statement in statements:
+                conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {max(version, len(self.MIGRATIONS))}")
+        conn.commit()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle.empty() and self.opened < self.size:
+                self.opened += 1
+                return self.connect()
+        return self.idle.get()
+
+    def release(self, conn):
+        if conn.in_transaction: conn.rollback()
+        self.idle.put(conn)
+
+    def close(self):
+        with self.pools_lock:
+            self.pools.pop(self.db_name, None)
+        while self.opened:
+            self.idle.get().close()
+            self.opened -= 1
+
+class PersistenceWorker:
+    # Applies store writes on a dedicated thread. Whatever has queued up while the previous write ran
+    # is coalesced into one transaction. Outcomes go to the results queue for the Tk thread to poll,
+    # since Tk must not be called from this thread.
+    MAX_BATCH = 1000
+
+    def __init__(self, store, maxsize=10000):
+        self.store = store
+        self.pending = queue.Queue(maxsize)
+        self.results = queue.Queue()
+        self.stats = {"writes": 0, "operations": 0, "conflicts": 0, "max_depth": 0, "last_latency": 0.0, "total_latency": 0.0}
+        self.thread = threading.Thread(target=self.run, name="persistence", daemon=True)
+        self.thread.start()
+
+    def submit(self, op, tasks):
+        # One queue item per call, so a batch of tasks is always written in the same transaction. Each
+        # operation carries the version its task was read at; an update moves the task's version on
+        # as it is queued, so the next update expects the row this one will leave. Added tasks ride
+        # along so they can be given the seq they were stored at.
+        self.pending.put(([(op, task.to_row(), task.version, task.seq) for task in tasks], tasks if op == "add" else ()))
+        if op == "update":
+            for task in tasks:
+                task.version += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.pending.qsize())
+
+    def add(self, *tasks): self.submit("add", tasks)
+    def update(self, *tasks): self.submit("update", tasks)
+    def delete(self, *tasks): self.submit("delete", tasks)
+
+    def depth(self): return self.pending.qsize()
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            queued = len(batch[0][0]) if batch[0] else 0
+            while queued < self.MAX_BATCH:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+                queued += len(batch[-1][0]) if batch[-1] else 0
+            items = [item for item in batch if item is not None]
+            operations = [operation for item in items for operation in item[0]]
+            running = None not in batch
+            if operations:
+                start = time.perf_counter()
+                seqs = {}
+                try:
+                    conflicts = self.store.apply(operations, seqs)
+                except sqlite3.Error as error:
+                    self.results.put(("error", error))
+                else:
+                    for item in items:
+                        for task in item[1]:
+                            task.seq = seqs.get(task.id, task.seq)
+                    if conflicts:
+                        self.stats["conflicts"] += len(conflicts)
+                        self.results.put(("conflict", conflicts))
+                    latency = time.perf_counter() - start
+                    Metrics.count("store.operations", len(operations))
+                    self.stats["writes"] += 1
+                    self.stats["operations"] += len(operations)
+                    self.stats["last_latency"] = latency
+                    self.stats["total_latency"] += latency
+                    self.results.put(("saved", len(operations), latency))
+            for _ in batch:
+                self.pending.task_done()
+
+    @Metrics.timed("store.flush")
+    def flush(self): self.pending.join()
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        self.store.close()
+
+class TaskJournal:
+    # Reader for the snapshot-plus-journal files tasks.json was kept in before the SQLite store, so
+    # import_json can fold them in. Nothing is written; the files are renamed once imported.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.journal_path = file_path + ".journal"
+        self.rotated_path = file_path + ".journal.old"
+        self.version = 0
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r') as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = []
+        if isinstance(data, dict):
+            self.version, records = data.get("version", 0), data.get("tasks", [])
+        else:
+            self.version, records = 0, data
+        # Snapshots written before tasks had ids get positional ones.
+        records = {task.setdefault("id", str(position)): task for position, task in enumerate(records)}
+        # A journal rotated out by an interrupted compaction comes first; one older than the
+        # snapshot is already part of it and is skipped.
+        self.replay(self.rotated_path, records)
+        self.replay(self.journal_path, records)
+        return list(records.values())
+
+    def replay(self, path, records):
+        # Applies every complete record from the journal's base on; a torn or corrupt tail is ignored.
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                op = record.get("op")
+                if op == "base":
+                    if record["version"] < self.version: return
+                elif op in ("add", "update"):
+                    records[record["task"]["id"]] = record["task"]
+                elif op == "delete":
+                    records.pop(record["id"], None)
+
+class TaskService:
+    # Everything done to one user's tasks, with no UI: the in-memory indexes, the store and its
+    # write-behind worker, and the undo history. Front ends add listeners to hear about restored,
+    # updated and removed tasks, called as listener(change, tasks, befores), and patch their own views.
+    # Several processes can share the database; sync() merges in what the others have written.
+    PAGE_SIZE = 200
+    HISTORY_LIMIT = 200
+    PERSIST_HISTORY = True
+    STATUSES = {"pending": False, "completed": True}
+
+    def __init__(self, user_id, db_name='users.db'):
+        self.user_id = user_id
+        self.db_name = db_name
+        self.tasks = TaskQueue()
+        self.schedule = PriorityQueue(Task.schedule_key)
+        self.search_index = SearchIndex()
+        self.facet_index = FacetIndex()
+        self.reminders = Reminders()
+        self.listeners = []
+        self.session = uuid.uuid4().hex
+        self.store = TaskRepository(db_name, user_id, self.session, dedicated=True)
+        self.history = History.load(self.store.load_history() if self.PERSIST_HISTORY else None, self.HISTORY_LIMIT)
+        self.writer = PersistenceWorker(TaskRepository(db_name, user_id, self.session, dedicated=True))
+        self.revision = self.store.revision()
+        self.data_version = self.store.data_version()
+        self.pages = self.store.pages(self.PAGE_SIZE)
+        self.loaded = False
+
+    def close(self):
+        if self.PERSIST_HISTORY: self.store.save_history(self.history.dump())
+        self.writer.close()
+        self.store.close()
+
+    def import_legacy(self, file_path="tasks.json"):
+        # Moves the tasks.json older versions shared between accounts into this one, then renames it so
+        # it happens once. Only the GUI login and the import-legacy command do this, before load_page.
+        return self.store.import_json(file_path)
+
+    @Metrics.timed("tasks.load_page")
+    def load_page(self):
+        # Indexes the next page of stored tasks and returns it, or None once everything is loaded.
+        tasks = next(self.pages, None)
+        if tasks is None:
+            self.loaded = True
+            return None
+        self.index_tasks(tasks)
+        Metrics.count("tasks.loaded", len(tasks))
+        return tasks
+
+    def load_all(self):
+        while self.load_page() is not None:
+            pass
+
+    def import_file(self, path):
+        # Yields each imported batch once it is indexed and queued for writing, so a caller can show
+        # the first rows while the rest of the file is still being read. An import only adds tasks: one
+        # whose id is already taken, in memory, in the store (on a page not loaded yet, say) or earlier
+        # in the same file, gets a fresh id.
+        seen = set()
+        for tasks in TaskFiles.batches(TaskFiles.read(path), self.PAGE_SIZE):
+            stored = self.store.stored_ids([task.id for task in tasks])
+            for task in tasks:
+                if task.id in seen or task.id in stored or self.tasks.get(task.id) is not None: task.id = uuid.uuid4().hex
+                seen.add(task.id)
+            self.writer.add(*tasks)
+            self.index_tasks(tasks)
+            yield tasks
+
+    def export(self, path):
+        # Reads from the database on its own connection, so it can run off the calling thread.
+        self.writer.flush()
+        repository = TaskRepository(self.db_name, self.user_id)
+        try:
+            TaskFiles.write(path, (task.to_row() for page in repository.pages(self.PAGE_SIZE) for task in page))
+        finally:
+            repository.close()
+        return path
+
+    def add(self, title, description="", due_date="", priority="Low", category="Other"):
+        self.check_due_date(due_date)
+        task = Task(title, description, due_date, priority, category)
+        self.add_many([task])
+        return self.tasks.get(task.id)
+
+    def add_many(self, tasks):
+        self.perform(AddTasks([task.to_row() for task in tasks]))
+
+    def complete_many(self, tasks, completed=True):
+        self.perform(EditTasks.diff(tasks, completed=completed))
+
+    def delete_many(self, tasks):
+        # Deleted in insertion order, so undo can put each run of adjacent tasks back in front of the same successor.
+        # Each row also records the task's stored seq, so undo restores it to the same place on disk. A
+        # task whose add the writer hasn't stored yet has no seq and is restored after the others.
+        tasks = sorted(tasks, key=lambda task: self.facet_index.orders[task.id])
+        self.perform(DeleteTasks([task.to_row() + (task.seq,) for task in tasks], self.tasks.successors(tasks)))
+
+    def edit(self, task, **values):
+        if "due_date" in values: self.check_due_date(values["due_date"])
+        self.perform(EditTasks.diff([task], **values))
+
+    @Metrics.timed("tasks.perform")
+    def perform(self, command):
+        if command is None: return
+        command.apply(self)
+        self.history.record(command)
+
+    @Metrics.timed("tasks.undo")
+    def undo(self): return self.history.undo(self)
+
+    @Metrics.timed("tasks.redo")
+    def redo(self): return self.history.redo(self)
+
+    @Metrics.timed("tasks.query")
+    def query(self, text="", category=None, priority=None, status=None, sort=None, descending=False):
+        # status is "pending", "completed" or "overdue"; sort is one of FacetIndex.SORT_KEYS.
+        orders = self.facet_index.filter(category=category, priority=priority, completed=self.STATUSES.get(status),
+                                         overdue=status == "overdue",
+                                         task_ids=self.search_index.search(text) if text else None)
+        if orders is None and sort is None: return list(self.tasks)[::-1] if descending else list(self.tasks)
+        return [self.tasks.get(task_id) for task_id in self.facet_index.ordered(sort, descending, orders)]
+
+    def next_task(self): return self.schedule.peek()
+
+    @Metrics.timed("tasks.sync")
+    def sync(self):
+        # Merges in what other processes have written since the last call and returns how many tasks
+        # changed. Polling is one PRAGMA while nothing has; otherwise only the tasks named in the change
+        # log are read. Nothing is merged until every page is loaded, so no task is both paged in and merged.
+        if not self.loaded: return 0
+        data_version = self.store.data_version()
+        if data_version == self.data_version: return 0
+        self.data_version = data_version
+        revision, changed, complete = self.store.changes(self.revision)
+        if not changed:
+            self.revision = revision
+            return 0
+        # Our own queued writes land first, so the rows read next are final: a write of ours that
+        # conflicted was skipped, and the other process's version is what gets merged.
+        self.writer.flush()
+        self.data_version = self.store.data_version()
+        self.revision, changed, complete = self.store.changes(self.revision)
+        if complete: changed.update((task.id, None) for task in self.tasks if task.id not in changed)
+        added, updated, removed = [], [], []
+        for task_id, stored in changed.items():
+            task = self.tasks.get(task_id)
+            if stored is None:
+                if task is not None: removed.append(task)
+            elif task is None:
+                task = Task.from_row(stored[0])
+                task.version, task.seq = stored[1], stored[2]
+                added.append(task)
+            elif task.version != stored[1] or task.to_row() != stored[0]:
+                for field, value in zip(Task.FIELDS[1:], stored[0][1:]):
+                    setattr(task, field, value)
+                task.completed = bool(task.completed)
+                task.version = stored[1]
+                updated.append(task)
+        if removed: self.remove_tasks(removed, persist=False)
+        if updated: self.update_tasks(updated, persist=False)
+        if added: self.restore_tasks(added, [None] * len(added), persist=False)
+        return len(added) + len(updated) + len(removed)
+
+    @staticmethod
+    def check_due_date(value):
+        if value and Task.parse_due_date(value) == Task.NO_DUE_DATE:
+            raise ValueError(f"Due date {value!r} is not a YYYY-MM-DD date.")
+
+    # The batch primitives commands run on: indexes are patched per task, while the store gets one
+    # transaction and listeners one call per batch, however many tasks it covers. sync() passes
+    # persist=False for changes that are already stored.
+    def index_tasks(self, tasks, befores=None):
+        for task, before in zip(tasks, befores or [None] * len(tasks)):
+            self.tasks.enqueue(task, before)
+            self.reschedule(task)
+            self.reminders.track(task)
+            self.search_index.add(task)
+        self.facet_index.add_many(tasks)
+
+    def restore_tasks(self, tasks, befores, persist=True):
+        self.index_tasks(tasks, befores)
+        if persist: self.writer.add(*tasks)
+        self.notify("restore", tasks, befores)
+
+    def update_tasks(self, tasks, persist=True):
+        for task in tasks:
+            self.reschedule(task)
+            self.reminders.track(task)
+            self.search_index.update(task)
+        self.facet_index.update_many(tasks)
+        if persist: self.writer.update(*tasks)
+        self.notify("update", tasks)
+
+    def remove_tasks(self, tasks, persist=True):
+        for task in tasks:
+            self.tasks.remove(task)
+            if task in self.schedule: self.schedule.remove(task)
+            self.reminders.forget(task)
+            self.search_index.remove(task)
+        self.facet_index.remove_many(tasks)
+        if persist: self.writer.delete(*tasks)
+        self.notify("remove", tasks)
+
+    def notify(self, change, tasks, befores=None):
+        for listener in self.listeners:
+            listener(change, tasks, befores)
+
+    def reschedule(self, task):
+        if task.completed:
+            if task in self.schedule: self.schedule.remove(task)
+        elif task in self.schedule:
+            self.schedule.update(task)
+        else:
+            self.schedule.push(task)
+
+def login(db_name, username):
+    password = os.environ.get("TASKMASTER_PASSWORD") or getpass.getpass(f"Password for {username}: ")
+    with DatabaseManager(db_name) as db:
+        return db.validate_user(username, password)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TaskMaster. Runs the GUI when no command is given; every other "
+                                                 "command works on one account's tasks without loading Tk.")
+    parser.add_argument("--db", default="users.db", help="database file (default: users.db)")
+    parser.add_argument("--user", help="account to act as; the password comes from TASKMASTER_PASSWORD or a prompt")
+    parser.add_argument("--metrics", metavar="PATH", help="collect timings and write them to PATH as JSON on exit")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("gui", help="open the dashboard (straight away when --user is given)")
+    listing = commands.add_parser("list", help="print tasks as tab-separated id, title, priority, due date, category, status")
+    listing.add_argument("--search", default="")
+    listing.add_argument("--category")
+    listing.add_argument("--priority")
+    listing.add_argument("--status", choices=["pending", "completed", "overdue"])
+    listing.add_argument("--sort", choices=list(FacetIndex.SORT_KEYS))
+    listing.add_argument("--descending", action="store_true")
+    listing.add_argument("--limit", type=int)
+    adding = commands.add_parser("add", help="add a task")
+    adding.add_argument("title")
+    adding.add_argument("--description", default="")
+    adding.add_argument("--due", default="", help="YYYY-MM-DD")
+    adding.add_argument("--priority", default="Low", choices=list(Task.PRIORITY_RANK))
+    adding.add_argument("--category", default="Other")
+    for name, help_text in (("complete", "mark tasks completed"), ("reopen", "mark tasks pending"), ("delete", "delete tasks")):
+        commands.add_parser(name, help=help_text).add_argument("ids", nargs="+")
+    commands.add_parser("import", help="import a JSON or JSON Lines file").add_argument("path")
+    commands.add_parser("export", help="export to .jsonl, .json or .csv").add_argument("path")
+    commands.add_parser("import-legacy", help="move a tasks.json from older versions into the account").add_argument(
+        "path", nargs="?", default="tasks.json")
+    commands.add_parser("undo", help="undo the account's last action")
+    commands.add_parser("redo", help="redo the last undone action")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        Metrics.enabled = True
+        atexit.register(Metrics.export, args.metrics)
+
+    if args.command in (None, "gui") and not args.user:
+        from Sample1 import main as run_gui  # tkinter and customtkinter load only here
+        return run_gui()
+    if args.command == "add":
+        try:
+            TaskService.check_due_date(args.due)
+        except ValueError as e:
+            parser.error(str(e))
+    if not args.user: parser.error(f"{args.command} needs --user")
+    user_id = login(args.db, args.user)
+    if user_id is None: parser.exit(1, "Invalid username or password\n")
+    if args.command in (None, "gui"):
+        from Sample1 import TaskManagerApp
+        return TaskManagerApp(user_id).mainloop()
+
+    service = TaskService(user_id, args.db)
+    try:
+        if args.command == "export":
+            print(f"Exported to {service.export(args.path)}")
+            return
+        if args.command == "import-legacy":
+            print(f"Imported {service.import_legacy(args.path)} task(s)")
+            return
+
+        if args.command == "list":
+            # Without a text search the list is one indexed query and no task is loaded; searching
+            # needs the in-memory word index.
+            if args.search:
+                service.load_all()
+                tasks = service.query(args.search, args.category, args.priority, args.status, args.sort, args.descending)[:args.limit]
+            else:
+                tasks = service.store.query(args.category, args.priority, args.status, args.sort, args.descending, args.limit)
+            today = date.today().toordinal()
+            for task in tasks:
+                print("\t".join((task.id, task.title, task.priority, task.due_date, task.category,
+                                 "completed" if task.completed else "overdue" if task.due_ordinal < today else "pending")))
+            return
+        service.load_all()
+        if args.command == "add":
+            print(service.add(args.title, args.description, args.due, args.priority, args.category).id)
+        elif args.command in ("complete", "reopen", "delete"):
+            tasks = [service.tasks.get(task_id) for task_id in args.ids]
+            missing = [task_id for task_id, task in zip(args.ids, tasks) if task is None]
+            if missing: parser.exit(1, f"No such task: {', '.join(missing)}\n")
+            if args.command == "delete": service.delete_many(tasks)
+            else: service.complete_many(tasks, args.command == "complete")
+        elif args.command == "import":
+            imported = 0
+            try:
+                for tasks in service.import_file(args.path):
+                    imported += len(tasks)
+            except (OSError, ValueError, TypeError) as e:
+                parser.exit(1, f"Import stopped after {imported} task(s): {e}\n")
+            print(f"Imported {imported} task(s)")
+        else:
+            try:
+                if getattr(service, args.command)() is None: print(f"Nothing to {args.command}")
+            except LookupError as e:
+                parser.exit(1, f"{e}\n")
+    finally:
+        service.close()
+    conflicts = service.writer.stats["conflicts"]
+    if conflicts: parser.exit(1, f"{conflicts} change(s) not saved: another process changed those tasks first\n")
+
+if __name__ == "__main__":
+    # Run the imported module rather than __main__, so Sample1's "from task_service import ..." sees
+    # the same Metrics, ConnectionPool and other class state that main() sets up.
+    import task_service
+    task_service.main()
@@ -0,0 +1,170 @@
+from datetime import date, timedelta
+import multiprocessing, random
+
+import pytest
+
+from benchmarks import make_tasks, stress_worker
+from task_service import FacetIndex, SearchIndex, TaskRepository, TaskService
+
+def snapshot(service):
+    return [task.to_row() for task in service.tasks]
+
+def reopen(service):
+    # A second service on the same database sees only what was stored.
+    service.writer.flush()
+    stored = TaskService(service.user_id, service.db_name)
+    stored.load_all()
+    return stored
+
+@pytest.fixture
+def db_name(tmp_path):
+    return str(tmp_path / "users.db")
+
+@pytest.fixture
+def service(db_name):
+    service = TaskService(1, db_name)
+    service.load_all()
+    yield service
+    service.close()
+
+def add_tasks(service, count, seed=0):
+    rng = random.Random(seed)
+    today = date.today()
+    for number in range(count):
+        due = "" if number % 7 == 0 else (today + timedelta(days=rng.randint(-20, 40))).isoformat()
+        task = service.add(f"{rng.choice(['Report', 'Call', 'Budget', 'Review'])} {number}", rng.choice(["", "weekly sync", "q3 numbers"]),
+                           due, rng.choice(["High", "Medium", "Low"]), rng.choice(["Work", "Personal", "Other"]))
+        if rng.random() < 0.3: service.complete_many([task])
+    return list(service.tasks)
+
+def test_delete_undo_keeps_order(service):
+    tasks = add_tasks(service, 30)
+    # Once stored, each task carries its seq, which undo puts it back at without waiting for the writer.
+    service.writer.flush()
+    assert all(task.seq is not None for task in tasks)
+    before = snapshot(service)
+    service.delete_many(tasks[3:9] + tasks[20:21] + tasks[-1:])
+    assert len(snapshot(service)) == len(before) - 8
+    service.undo()
+    assert snapshot(service) == before
+    stored = reopen(service)
+    assert snapshot(stored) == before
+    stored.close()
+
+def test_edit_undo_redo(service):
+    task = add_tasks(service, 5)[2]
+    original = task.to_row()
+    service.edit(task, title="Renamed", priority="High", completed=not task.completed)
+    edited = task.to_row()
+    assert edited != original
+    service.undo()
+    assert task.to_row() == original
+    service.redo()
+    assert task.to_row() == edited
+    stored = reopen(service)
+    assert stored.tasks.get(task.id).to_row() == edited
+    stored.close()
+
+@pytest.mark.parametrize("text", ["", "re", "report", "weekly re", "q3"])
+@pytest.mark.parametrize("status", [None, "pending", "completed", "overdue"])
+def test_query_matches_brute_force(service, text, status):
+    tasks = add_tasks(service, 200)
+    today = date.today().toordinal()
+    statuses = {"pending": lambda task: not task.completed, "completed": lambda task: task.completed,
+                "overdue": lambda task: not task.completed and task.due_ordinal < today}
+
+    def matches(task, category, priority):
+        words = SearchIndex.tokenize(task.title + " " + task.description)
+        return (all(any(word.startswith(term) for word in words) for term in SearchIndex.tokenize(text))
+                and category in (None, task.category) and priority in (None, task.priority)
+                and (status is None or statuses[status](task)))
+
+    for category, priority in [(None, None), ("Work", None), (None, "High"), ("Personal", "Low")]:
+        expected = [task for task in tasks if matches(task, category, priority)]
+        assert service.query(text, category, priority, status) == expected
+        for column, key in FacetIndex.SORT_KEYS.items():
+            for descending in (False, True):
+                ordered = sorted(expected, key=key)
+                if descending: ordered.reverse()
+                assert service.query(text, category, priority, status, column, descending) == ordered
+
+@pytest.mark.parametrize("status", [None, "pending", "completed", "overdue"])
+def test_store_query_matches_service_query(service, status):
+    add_tasks(service, 200)
+    service.writer.flush()
+    for category, priority in [(None, None), ("Work", None), (None, "High"), ("Personal", "Low")]:
+        for sort in [None] + list(FacetIndex.SORT_KEYS):
+            for descending in (False, True):
+                expected = [task.to_row() for task in service.query("", category, priority, status, sort, descending)]
+                stored = service.store.query(category, priority, status, sort, descending)
+                assert [task.to_row() for task in stored] == expected
+                assert [task.to_row() for task in service.store.query(category, priority, status, sort, descending, 5)] == expected[:5]
+
+def test_sync_merges_other_service(service, db_name):
+    tasks = add_tasks(service, 10)
+    other = TaskService(1, db_name)
+    other.load_all()
+    added = other.add("From elsewhere", priority="High")
+    other.edit(other.tasks.get(tasks[0].id), title="Edited elsewhere")
+    other.delete_many([other.tasks.get(tasks[1].id)])
+    other.writer.flush()
+    assert service.sync() == 3
+    assert snapshot(service) == snapshot(other)
+    assert service.tasks.get(added.id).title == "From elsewhere"
+    assert service.query("elsewhere") == service.query("elsewhere", sort="Title")
+    assert service.sync() == 0
+    other.close()
+
+def test_services_leave_pool_free(service, db_name, tmp_path):
+    # Each service holds its own connections, so more services than pooled connections can still export.
+    others = [TaskService(user_id, db_name) for user_id in range(2, 6)]
+    add_tasks(service, 3)
+    path = service.export(str(tmp_path / "tasks.jsonl"))
+    assert len(open(path).readlines()) == 3
+    for other in others:
+        other.close()
+
+def test_legacy_import_is_explicit(db_name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "tasks.json").write_text('[{"id": "a1", "title": "Old"}]')
+    service = TaskService(1, db_name)
+    assert (tmp_path / "tasks.json").exists()
+    assert service.import_legacy() == 1
+    assert not (tmp_path / "tasks.json").exists()
+    service.load_all()
+    assert [task.title for task in service.tasks] == ["Old"]
+    service.close()
+
+def test_import_gives_repeated_ids_fresh_ones(service, db_name, tmp_path):
+    # other has loaded before "Stored" was written, so that task is in the database but not in its memory.
+    other = TaskService(1, db_name)
+    other.load_all()
+    stored = service.add("Stored")
+    service.writer.flush()
+    path = tmp_path / "tasks.jsonl"
+    path.write_text(f'{{"id": "x1", "title": "A"}}\n{{"id": "x1", "title": "B"}}\n{{"id": "{stored.id}", "title": "C"}}\n')
+    imported = [task for tasks in other.import_file(str(path)) for task in tasks]
+    assert len({task.id for task in imported}) == 3 and stored.id not in {task.id for task in imported}
+    other.writer.flush()
+    other.sync()
+    assert sorted(task.title for task in other.tasks) == ["A", "B", "C", "Stored"]
+
+    assert [task.title for task in other.query(sort="Title")] == ["A", "B", "C", "Stored"]
+    other.close()
+    assert other.writer.stats["conflicts"] == 0
+
+def test_processes_converge_on_stored_rows(db_name):
+    # bench_shared_store's workers: each process adds, edits and deletes with periodic sync(), then
+    # syncs once more after all are done and must hold exactly the stored rows and versions.
+    repository = TaskRepository(db_name, 1)
+    repository.add_many(make_tasks(50))
+    context = multiprocessing.get_context("spawn")
+    barrier, reported = context.Barrier(3), context.Queue()
+    workers = [context.Process(target=stress_worker, args=(db_name, 1, 150, seed, barrier, reported)) for seed in range(3)]
+    for worker in workers: worker.start()
+    reports = [reported.get(timeout=120) for _ in workers]
+    for worker in workers: worker.join()
+    stored = sorted((task.to_row(), task.version) for page in repository.pages(1000) for task in page)
+    repository.close()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert [report[4] == stored for report in reports] == [True] * 3